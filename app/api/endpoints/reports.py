@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, Query
+import base64
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List
+from typing import Iterator, List, Literal, Optional, Tuple
 
-from app.db.database import get_db
+from app.db.database import get_db, stream_query
 from app.schemas.analytical_reports import (
     TopProduct, 
     ChannelActivity, 
@@ -13,6 +18,26 @@ from app.schemas.analytical_reports import (
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+EXPORT_COLUMNS = ["message_id", "channel_name", "message_text", "view_count"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _encode_cursor(message_id: int, channel_key: str) -> str:
+    """Packs the keyset position of the last returned row into an opaque token."""
+    raw = json.dumps([message_id, channel_key]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        message_id, channel_key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(message_id), str(channel_key)
+    except (ValueError, TypeError, OverflowError):  # OverflowError: int(1e999)
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
 @router.get("/top-products", response_model=List[TopProduct], summary="Get Top Mentioned Products")
 def get_top_products(limit: int = 10, db: Session = Depends(get_db)):
     # Note: Using public.fct_messages as confirmed by your \dt command
@@ -20,7 +45,7 @@ def get_top_products(limit: int = 10, db: Session = Depends(get_db)):
         SELECT message_text as product_name, COUNT(*) as mention_count 
         FROM public.fct_messages 
         GROUP BY 1 
-        ORDER BY 2 DESC 
+        ORDER BY 2 DESC, 1 
         LIMIT :limit
     """)
     result = db.execute(query, {"limit": limit})
@@ -38,19 +63,80 @@ def get_channel_activity(channel_name: str, db: Session = Depends(get_db)):
     return [{"message_date": row[0], "post_count": row[1]} for row in result]
 
 @router.get("/search/messages", response_model=List[MessageSearchResult])
-def search_messages(query: str, limit: int = 20, db: Session = Depends(get_db)):
-    sql = text("""
+def search_messages(
+    response: Response,
+    query: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description=f"Value of the {NEXT_CURSOR_HEADER} header from the previous page"),
+    db: Session = Depends(get_db),
+):
+    # Keyset pagination on (message_id, channel_key): each page seeks past the
+    # last row of the previous one instead of scanning and discarding an OFFSET.
+    params = {"search": f"%{query}%", "limit": limit + 1}
+    keyset_filter = ""
+    if cursor:
+        params["after_id"], params["after_key"] = _decode_cursor(cursor)
+        keyset_filter = "AND (message_id, channel_key) > (:after_id, :after_key)"
+
+    sql = text(f"""
         SELECT message_id, channel_key as channel_name, message_text, view_count 
         FROM public.fct_messages 
         WHERE message_text ILIKE :search 
+        {keyset_filter}
+        ORDER BY message_id, channel_key
         LIMIT :limit
     """)
-    result = db.execute(sql, {"search": f"%{query}%", "limit": limit})
+    rows = db.execute(sql, params).fetchall()
+
+    # One extra row was fetched to know whether another page exists
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(rows[-1][0], str(rows[-1][1]))
+
     return [
         {"message_id": row[0], "channel_name": str(row[1]), "message_text": row[2], "view_count": row[3]} 
-        for row in result
+        for row in rows
     ]
 
+def _stream_message_batches(query: Optional[str]) -> Iterator[list]:
+    """Yields row batches from a server-side cursor so memory stays bounded."""
+    sql = text(f"""
+        SELECT message_id, channel_key as channel_name, message_text, view_count 
+        FROM public.fct_messages 
+        {"WHERE message_text ILIKE :search" if query else ""}
+        ORDER BY message_id, channel_key
+    """)
+    params = {"search": f"%{query}%"} if query else {}
+    # The session from get_db is closed before a streamed body is sent,
+    # so the export holds its own connection for the lifetime of the response.
+    yield from stream_query(sql, params, EXPORT_BATCH_SIZE)
+
+def _iter_ndjson(query: Optional[str]) -> Iterator[str]:
+    for batch in _stream_message_batches(query):
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n" for row in batch)
+
+def _iter_csv(query: Optional[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in _stream_message_batches(query):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header-only export when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/export/messages", summary="Stream all matching messages as NDJSON or CSV")
+def export_messages(format: Literal["ndjson", "csv"] = "ndjson", query: Optional[str] = None):
+    rows = _iter_ndjson(query) if format == "ndjson" else _iter_csv(query)
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="messages.{format}"'},
+    )
+
 @router.get("/visual-content", response_model=List[VisualStats])
 def get_visual_stats(db: Session = Depends(get_db)):
     # CRITICAL FIX: Pointing to the schema 'public_analytics' created by dbt
@@ -1,3 +1,4 @@
+import os
 from pydantic_settings import BaseSettings
 from dataclasses import dataclass
 
@@ -21,6 +22,13 @@ class Settings(BaseSettings):
     DB_PORT: str = "5432"
     DB_NAME: str = "medical_warehouse"
 
+    # Statements slower than this are logged to 'app.sql.slow' (0 disables)
+    SLOW_QUERY_MS: float = 0.0
+
+    # "postgres" or "columnar" (DuckDB over the Parquet marts in MARTS_DIR)
+    REPORTS_BACKEND: str = "postgres"
+    MARTS_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/marts"))
+
     # --- THE FIX IS HERE ---
     # You must provide the type hint 'ProjectConstants' 
     # so Pydantic includes it in the object attributes.
@@ -0,0 +1,189 @@
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+# --- Constants ---
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NO_ROUTE: str = "-"
+PROMETHEUS_CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            counts, total, count = self._series.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._series[labels] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = _format_labels(self.label_names, labels, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le_inf = _format_labels(self.label_names, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le_inf} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+# --- Registry ---
+REQUESTS_TOTAL = Counter("api_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("api_request_duration_seconds", "End-to-end handler latency until response headers.", ("method", "route"))
+REQUEST_SQL_SECONDS = Histogram("api_request_sql_seconds", "Time spent executing SQL per request.", ("route",))
+REQUEST_NON_SQL_SECONDS = Histogram("api_request_non_sql_seconds", "Request time outside SQL and pool waits (validation, serialization).", ("route",))
+POOL_WAIT_SECONDS = Histogram("api_db_pool_wait_seconds", "Time spent acquiring a pooled database connection.", ("route",))
+SQL_QUERY_SECONDS = Histogram("api_sql_query_seconds", "Latency of individual SQL statements.", ("route",))
+SQL_QUERIES_TOTAL = Counter("api_sql_queries_total", "SQL statements executed.", ("route",))
+ROWS_RETURNED_TOTAL = Counter("api_sql_rows_total", "Rows reported by the driver for executed statements.", ("route",))
+SLOW_QUERIES_TOTAL = Counter("api_sql_slow_queries_total", "Statements slower than SLOW_QUERY_MS.", ("route",))
+
+REGISTRY = [
+    REQUESTS_TOTAL, REQUEST_SECONDS, REQUEST_SQL_SECONDS, REQUEST_NON_SQL_SECONDS,
+    POOL_WAIT_SECONDS, SQL_QUERY_SECONDS, SQL_QUERIES_TOTAL, ROWS_RETURNED_TOTAL, SLOW_QUERIES_TOTAL,
+]
+
+
+@dataclass
+class RequestStats:
+    """Per-request accumulator shared by the middleware and the SQLAlchemy hooks."""
+    scope: Dict[str, Any] = field(default_factory=dict)
+    sql_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+
+    @property
+    def route(self) -> str:
+        # The router stores the matched route in the ASGI scope; using its path
+        # template keeps label cardinality bounded (no raw channel names).
+        route = self.scope.get("route")
+        if route is None:
+            return NO_ROUTE
+        # Included routers may only know their own suffix; restore the mount
+        # prefix from the concrete path (templates never span a '/').
+        template = [part for part in route.path.split("/") if part]
+        path = [part for part in self.scope.get("path", "").split("/") if part]
+        prefix = path[:max(len(path) - len(template), 0)]
+        return "/" + "/".join(prefix + template)
+
+
+# Threadpool-run endpoints receive a copy of the context, so the stats object
+# itself (not the variable) is what gets mutated.
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def begin_request(scope: Dict[str, Any]) -> RequestStats:
+    stats = RequestStats(scope=scope)
+    _current_request.set(stats)
+    return stats
+
+
+def end_request(stats: RequestStats, method: str, status: int, elapsed: float) -> None:
+    route = stats.route
+    REQUESTS_TOTAL.inc(method, route, str(status))
+    REQUEST_SECONDS.observe(elapsed, method, route)
+    REQUEST_SQL_SECONDS.observe(stats.sql_seconds, route)
+    REQUEST_NON_SQL_SECONDS.observe(max(elapsed - stats.sql_seconds - stats.pool_wait_seconds, 0.0), route)
+
+
+def _current_route(stats: Optional[RequestStats]) -> str:
+    return stats.route if stats else NO_ROUTE
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = _current_request.get()
+    if stats:
+        stats.pool_wait_seconds += seconds
+    POOL_WAIT_SECONDS.observe(seconds, _current_route(stats))
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _current_request.get()
+    route = _current_route(stats)
+    if stats:
+        stats.sql_seconds += elapsed
+
+    SQL_QUERY_SECONDS.observe(elapsed, route)
+    SQL_QUERIES_TOTAL.inc(route)
+    # Server-side cursors report -1 until rows are fetched
+    if cursor.rowcount and cursor.rowcount > 0:
+        ROWS_RETURNED_TOTAL.inc(route, amount=cursor.rowcount)
+
+    threshold_ms = settings.SLOW_QUERY_MS
+    if threshold_ms > 0 and elapsed * 1000 >= threshold_ms:
+        SLOW_QUERIES_TOTAL.inc(route)
+        slow_query_logger.warning(
+            "Slow query (%.1f ms, route=%s): %s",
+            elapsed * 1000, route, re.sub(r"\s+", " ", statement).strip(),
+        )
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,107 @@
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Mart tables served by the columnar backend, exported as <MARTS_DIR>/<schema>/<table>.parquet
+MART_TABLES: Tuple[Tuple[str, str], ...] = (
+    ("public", "fct_messages"),
+    ("public_analytics", "fct_image_detections"),
+    ("public", "dim_channels"),
+)
+
+# ':name' bind parameters, but not '::type' casts
+_BIND_PARAM = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+_connections: Dict[str, Any] = {}
+_connection_lock = threading.Lock()
+
+
+def mart_path(schema: str, table: str, marts_dir: Optional[str] = None) -> str:
+    return os.path.join(marts_dir or settings.MARTS_DIR, schema, f"{table}.parquet")
+
+
+def _get_connection(marts_dir: str):
+    """Builds the process-wide in-memory DuckDB catalog for a marts directory on first use."""
+    with _connection_lock:
+        if marts_dir not in _connections:
+            import duckdb
+
+            conn = duckdb.connect(database=":memory:")
+            for schema, table in MART_TABLES:
+                path = mart_path(schema, table, marts_dir).replace("'", "''")
+                conn.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+                # Views re-read the file per query, so a fresh export is picked up without a restart
+                conn.execute(f"CREATE VIEW {schema}.{table} AS SELECT * FROM read_parquet('{path}')")
+            _connections[marts_dir] = conn
+        return _connections[marts_dir]
+
+
+class ColumnarResult:
+    """The subset of SQLAlchemy's Result API used by the report endpoints."""
+
+    def __init__(self, cursor) -> None:
+        self._cursor = cursor
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self.fetchall())
+
+    def fetchall(self) -> List[tuple]:
+        return self._cursor.fetchall()
+
+    def partitions(self, size: int) -> Iterator[List[tuple]]:
+        while True:
+            batch = self._cursor.fetchmany(size)
+            if not batch:
+                return
+            yield batch
+
+
+class ColumnarSession:
+    """Answers the report SQL from the exported Parquet marts with an in-process DuckDB."""
+
+    def __init__(self, marts_dir: Optional[str] = None) -> None:
+        # DuckDB cursors are independent connections to the shared catalog,
+        # so each request gets its own and can run on any worker thread.
+        self._cursor = _get_connection(marts_dir or settings.MARTS_DIR).cursor()
+
+    def execute(self, statement, params: Optional[Dict[str, Any]] = None) -> ColumnarResult:
+        sql = str(statement)
+        names = set(_BIND_PARAM.findall(sql))
+        bound = {name: value for name, value in (params or {}).items() if name in names}
+        self._cursor.execute(_BIND_PARAM.sub(r"$\1", sql), bound)
+        return ColumnarResult(self._cursor)
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+def verify_parity(pg_session, columnar_session, channel_name: Optional[str] = None) -> List[str]:
+    """Runs every report endpoint against both backends and lists the ones that disagree."""
+    from fastapi import Response
+    from sqlalchemy import text
+    from app.api.endpoints import reports
+
+    if channel_name is None:
+        row = pg_session.execute(text("SELECT channel_name FROM public.dim_channels LIMIT 1")).fetchone()
+        channel_name = row[0] if row else ""
+
+    def as_rows(items: List[Any]) -> List[tuple]:
+        return sorted(tuple(sorted(item.items())) for item in items)
+
+    checks: Dict[str, Tuple[Callable[[Any], List[Any]], Callable[[List[Any]], Any]]] = {
+        # Names tied at the LIMIT boundary may legitimately differ; the counts may not
+        "top-products": (lambda db: reports.get_top_products(limit=10, db=db),
+                         lambda items: [item["mention_count"] for item in items]),
+        "channel-activity": (lambda db: reports.get_channel_activity(channel_name, db=db), as_rows),
+        "search-messages": (lambda db: reports.search_messages(Response(), query="", limit=100, cursor=None, db=db), as_rows),
+        "visual-content": (lambda db: reports.get_visual_stats(db=db), as_rows),
+    }
+
+    mismatches = []
+    for name, (run, normalise) in checks.items():
+        if normalise(run(pg_session)) != normalise(run(columnar_session)):
+            mismatches.append(name)
+    return mismatches
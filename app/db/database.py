@@ -1,13 +1,52 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from app.core import metrics
 from app.core.config import settings # Assuming DATABASE_URL is in your config
 
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Per-statement timing for the /metrics endpoint and the slow-query log
+event.listen(engine, "before_cursor_execute", metrics.before_cursor_execute)
+event.listen(engine, "after_cursor_execute", metrics.after_cursor_execute)
+
+def use_columnar_backend() -> bool:
+    return settings.REPORTS_BACKEND == "columnar"
+
 def get_db():
+    if use_columnar_backend():
+        from app.db.columnar import ColumnarSession
+        db = ColumnarSession()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+
     db = SessionLocal()
     try:
+        # Check out the connection up front so pool waits are measured separately from SQL
+        start = time.perf_counter()
+        db.connection()
+        metrics.record_pool_wait(time.perf_counter() - start)
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def stream_query(sql, params, batch_size):
+    """Yields row batches from a server-side cursor on a dedicated connection."""
+    if use_columnar_backend():
+        from app.db.columnar import ColumnarSession
+        db = ColumnarSession()
+        try:
+            yield from db.execute(sql, params).partitions(batch_size)
+        finally:
+            db.close()
+        return
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        metrics.record_pool_wait(time.perf_counter() - start)
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(sql, params)
+        yield from result.partitions()
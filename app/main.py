@@ -1,15 +1,32 @@
+import time
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from app.api.routes import api_router
-from fastapi.responses import RedirectResponse
+from app.core import metrics
+from fastapi.responses import PlainTextResponse, RedirectResponse
 app = FastAPI(
     title="Medical Data Warehouse API",
     description="Analytical endpoints for medical Telegram data and image analysis.",
     version="1.0.0"
 )
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Streamed bodies are sent after call_next returns, so exports are timed to first byte
+    stats = metrics.begin_request(request.scope)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.end_request(stats, request.method, status, time.perf_counter() - start)
 @app.get("/", include_in_schema=False)
 def root():
     return RedirectResponse(url="/docs")
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
 # Include the master router that aggregates all endpoints.
 app.include_router(api_router, prefix="/api/v1")
 if __name__ == "__main__":
@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import contextlib
+import io
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from medical_warehouse.Scripts.config import settings
+from medical_warehouse.Scripts.synthetic_data import SyntheticDataGenerator
+
+# --- Benchmark Constants ---
+PROJECT_ROOT: str = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR: str = os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.BENCHMARK_SUBDIR)
+DATABASE_URL_ENV: str = "BENCH_DATABASE_URL"  # e.g. a throwaway local Postgres; never the warehouse
+BENCH_SCHEMA: str = "bench"
+REGRESSION_THRESHOLD: float = 0.10  # Flag stages more than 10% slower than the baseline
+
+
+@dataclass
+class BenchResult:
+    """Timings of one benchmark across repeats."""
+    name: str
+    items: int = 0
+    runs: List[float] = field(default_factory=list)
+    skipped: Optional[str] = None
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.runs) if self.runs else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.skipped:
+            return {"skipped": self.skipped}
+        return {
+            "items": self.items,
+            "runs": [round(r, 6) for r in self.runs],
+            "median_seconds": round(self.median, 6),
+            "min_seconds": round(min(self.runs), 6),
+            "items_per_second": round(self.items / self.median, 1) if self.median else None,
+        }
+
+
+def time_stage(name: str, fn: Callable[[], Any], items: int, repeat: int,
+               setup: Optional[Callable[[], None]] = None,
+               check: Optional[Callable[[Any], None]] = None) -> BenchResult:
+    """Times `fn` `repeat` times; `setup` runs untimed before each call and `check` validates its output."""
+    result = BenchResult(name, items)
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        output = fn()
+        result.runs.append(time.perf_counter() - start)
+        if check:
+            check(output)
+    print(f"⏱️ {name:<20} median {result.median:8.3f}s over {repeat} runs ({items} items)")
+    return result
+
+
+def _expect(expected: int, actual: int, what: str) -> None:
+    if actual != expected:
+        raise RuntimeError(f"{what}: expected {expected} rows, got {actual}")
+
+
+def git_revision() -> str:
+    """Short HEAD SHA, suffixed with -dirty when the working tree has changes."""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=PROJECT_ROOT).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{sha}-dirty" if dirty else sha
+
+
+# --- Benchmarks ---
+def bench_files(gen: SyntheticDataGenerator, repeat: int) -> List[BenchResult]:
+    from medical_warehouse.Scripts.load_to_postgres import TelegramDataLoader
+    from medical_warehouse.Scripts.lake import TelegramLake, MESSAGE_COLUMNS
+
+    loader = TelegramDataLoader()  # No database work until an upload
+    json_dir = gen.path(settings.PROJECT.JSON_SUBDIR)
+    lake = TelegramLake(gen.path(settings.PROJECT.LAKE_SUBDIR))
+    return [
+        time_stage("load_json_files", lambda: loader.load_json_files(json_dir), gen.total_messages, repeat,
+                   check=lambda rows: _expect(gen.total_messages, len(rows), "load_json_files")),
+        time_stage("lake_read", lambda: lake.read(MESSAGE_COLUMNS), gen.total_messages, repeat,
+                   check=lambda df: _expect(gen.total_messages, len(df), "lake_read")),
+    ]
+
+
+def bench_classification(gen: SyntheticDataGenerator, repeat: int) -> BenchResult:
+    """Result building (filename parsing + _classify_image) without YOLO inference itself."""
+    from medical_warehouse.Scripts.yolo_detect import YOLOAnalyzer
+
+    analyzer = YOLOAnalyzer()
+    detections = list(gen.detections())
+
+    def build_rows() -> List[Dict[str, Any]]:
+        return [analyzer._build_result(YOLOAnalyzer.message_id_from_path(path), names, confs, path)
+                for _, names, confs, path in detections]
+
+    return time_stage("classify_results", build_rows, len(detections), repeat)
+
+
+def bench_postgres(gen: SyntheticDataGenerator, repeat: int, database_url: Optional[str],
+                   detections_csv: str) -> List[BenchResult]:
+    names = ["upload_to_postgres", "upload_yolo_csv"]
+    if not database_url:
+        print(f"⏭️ Set {DATABASE_URL_ENV} to benchmark the Postgres uploads; skipping.")
+        return [BenchResult(name, skipped=f"{DATABASE_URL_ENV} not set") for name in names]
+
+    from sqlalchemy import create_engine, text
+    from medical_warehouse.Scripts.load_to_postgres import TelegramDataLoader
+    from medical_warehouse.Scripts.yolo_data_loader import YoloDataHandler
+
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {BENCH_SCHEMA}"))
+    except Exception as e:
+        print(f"⚠️ Cannot reach the benchmark database ({e.__class__.__name__}); skipping.")
+        return [BenchResult(name, skipped="database unreachable") for name in names]
+
+    def drop(table: str) -> Callable[[], None]:
+        def _drop() -> None:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {BENCH_SCHEMA}.{table}"))
+        return _drop
+
+    def count(table: str) -> int:
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT count(*) FROM {BENCH_SCHEMA}.{table}")).scalar()
+
+    loader = TelegramDataLoader()
+    loader.engine = engine  # Bypass the CREATE DATABASE check against the warehouse settings
+    records = loader.load_json_files(gen.path(settings.PROJECT.JSON_SUBDIR))
+    handler = YoloDataHandler(engine=engine)
+    detection_rows = sum(1 for _ in gen.detections())
+
+    def upload_csv() -> None:
+        with contextlib.redirect_stdout(io.StringIO()):  # The handler reports progress with print()
+            handler.upload_yolo_csv(detections_csv, table_name="image_analysis", schema=BENCH_SCHEMA)
+
+    try:
+        return [
+            time_stage("upload_to_postgres",
+                       lambda: loader.upload_to_postgres(records, "telegram_messages", BENCH_SCHEMA),
+                       len(records), repeat, setup=drop("telegram_messages"),
+                       check=lambda _: _expect(len(records), count("telegram_messages"), "upload_to_postgres")),
+            time_stage("upload_yolo_csv", upload_csv, detection_rows, repeat, setup=drop("image_analysis"),
+                       check=lambda _: _expect(detection_rows, count("image_analysis"), "upload_yolo_csv")),
+        ]
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+def bench_shap(gen: SyntheticDataGenerator, repeat: int, rows: int) -> List[BenchResult]:
+    from medical_warehouse.Scripts.explainability import generate_model_explanations
+
+    features_path, model_path = gen.write_features(rows)
+    output_dir = gen.path("results")
+
+    def explain(use_cache: bool) -> Dict[str, Any]:
+        return generate_model_explanations(model_path, features_path, output_dir, use_cache=use_cache)
+
+    cold = time_stage("shap_cold", lambda: explain(False), rows, repeat)
+    explain(True)  # Prime the value cache and the rendered plots
+    cached = time_stage("shap_cached", lambda: explain(True), rows, repeat,
+                        check=lambda summary: _expect(0, summary["computed"], "shap_cached"))
+    return [cold, cached]
+
+
+def run_benchmarks(channels: int, messages: int, repeat: int, shap_rows: int,
+                   database_url: Optional[str], skip_shap: bool = False) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="medical_bench_") as root:
+        gen = SyntheticDataGenerator(root, channels=channels, messages_per_channel=messages)
+        print(f"🧪 Generating {gen.total_messages} synthetic messages across {channels} channels...")
+        gen.write_json()
+        gen.write_lake()
+        gen.write_images()
+        detections_csv = gen.write_detections_csv()
+        # The loaders log every call at INFO; keep the timing output readable
+        logging.getLogger().setLevel(logging.WARNING)
+
+        results = bench_files(gen, repeat)
+        results.append(bench_classification(gen, repeat))
+        results.extend(bench_postgres(gen, repeat, database_url, detections_csv))
+        if skip_shap:
+            results.extend(BenchResult(name, skipped="--skip-shap") for name in ("shap_cold", "shap_cached"))
+        else:
+            results.extend(bench_shap(gen, repeat, shap_rows))
+
+    return {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"channels": channels, "messages_per_channel": messages, "repeat": repeat, "shap_rows": shap_rows},
+        "results": {r.name: r.to_dict() for r in results},
+    }
+
+
+# --- Regression comparison ---
+def report_path(ref: str, results_dir: str = RESULTS_DIR) -> str:
+    """Resolves a report reference given as a path or as a revision in the results directory."""
+    return ref if os.path.exists(ref) else os.path.join(results_dir, f"{ref}.json")
+
+
+def load_report(ref: str, results_dir: str = RESULTS_DIR) -> Dict[str, Any]:
+    """Loads a report by path, or by revision from the results directory."""
+    with open(report_path(ref, results_dir), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any],
+                    threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Prints median timings side by side and returns the benchmarks that regressed."""
+    if current["params"] != baseline["params"]:
+        print(f"⚠️ Parameters differ from the baseline ({baseline['params']}); ratios are not comparable.")
+    print(f"\n{'benchmark':<20}{baseline['revision']:>14}{current['revision']:>14}{'change':>9}")
+    regressions: List[str] = []
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name, {})
+        if "median_seconds" not in now or "median_seconds" not in before:
+            print(f"{name:<20}{'n/a':>14}{'n/a':>14}")
+            continue
+        change = now["median_seconds"] / before["median_seconds"] - 1 if before["median_seconds"] else 0.0
+        flag = " ❌" if change > threshold else ""
+        print(f"{name:<20}{before['median_seconds']:>14.3f}{now['median_seconds']:>14.3f}{change:>+9.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def save_report(report: Dict[str, Any], output_dir: str = RESULTS_DIR, baseline: Optional[str] = None) -> str:
+    """Writes <revision>.json, or a timestamped name when that file is the `baseline` being compared against."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{report['revision']}.json")
+    if baseline and os.path.exists(path) and os.path.samefile(path, baseline):
+        path = os.path.join(output_dir, f"{report['revision']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=1000, help="Messages per channel")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--shap-rows", type=int, default=2000)
+    parser.add_argument("--skip-shap", action="store_true")
+    parser.add_argument("--database-url", default=os.environ.get(DATABASE_URL_ENV),
+                        help=f"Scratch Postgres for the upload benchmarks (default: ${DATABASE_URL_ENV})")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", metavar="REVISION_OR_PATH", help="Baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    # Read the baseline up front: this run's report may be saved under the same name
+    baseline_path = report_path(args.compare, args.output_dir) if args.compare else None
+    baseline = load_report(baseline_path) if baseline_path else None
+    report = run_benchmarks(args.channels, args.messages, args.repeat, args.shap_rows,
+                            args.database_url, skip_shap=args.skip_shap)
+    print(f"\n📄 Results written to {save_report(report, args.output_dir, baseline=baseline_path)}")
+    if baseline is not None:
+        regressed = compare_reports(report, baseline, args.threshold)
+        if regressed:
+            print(f"❌ Slower than {args.compare}: {', '.join(regressed)}")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.compare}.")
@@ -1,6 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import math
 import os
+import time
+import json
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+from medical_warehouse.Scripts.lake import read_table
 
 st.set_page_config(page_title="Medical BI Dashboard", layout="wide")
 
@@ -11,21 +19,115 @@ DATA_FILE = get_abs_path("data/raw/processed_data.csv")
 PLOT_GLOBAL = get_abs_path("data/results/shap_summary_plot.png")
 PLOT_LOCAL = get_abs_path("data/results/shap_local_prediction.png")
 
-st.title("🏥 Ethiopian Medical Business Intelligence")
+# Set e.g. DASHBOARD_API_URL=http://localhost:8000 to read messages from the reports API
+API_URL = os.environ.get("DASHBOARD_API_URL", "").rstrip("/")
+API_SEARCH_PATH = "/api/v1/reports/search/messages"
+API_CURSOR_HEADER = "X-Next-Cursor"
+API_REFRESH_SECONDS = 300
+API_MAX_PAGE_SIZE = 500  # The search endpoint's upper bound for `limit`
+CHANNEL_COLUMN = "channel_name"
+PAGE_SIZES = [50, 100, 500, 1000]
+
+# --- Cached data layer ---
+# Every loader takes a `version` (file mtime, or a refresh bucket for the API) so
+# the caches invalidate when the data changes and are reused across reruns otherwise.
+# cache_resource hands back the same frame without copying it; callers only read it.
+
+def _source_version(source: str) -> float:
+    if source.startswith("http"):
+        return float(int(time.time() // API_REFRESH_SECONDS))
+    return os.path.getmtime(source)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def list_columns(source: str, version: float) -> List[str]:
+    return list(pd.read_csv(source, nrows=0).columns)
+
+@st.cache_resource(show_spinner="Loading data...", max_entries=3)
+def load_frame(source: str, version: float, columns: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+    return read_table(source, columns)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def channel_index(source: str, version: float) -> Dict[str, np.ndarray]:
+    """Row positions per channel, so filtering is a lookup instead of a full-column scan."""
+    channels = load_frame(source, version, (CHANNEL_COLUMN,))[CHANNEL_COLUMN]
+    return {str(name): positions for name, positions in channels.groupby(channels, sort=True).indices.items()}
+
+@st.cache_data(show_spinner="Fetching page...", max_entries=64)
+def fetch_page(api_url: str, query: str, cursor: Optional[str], limit: int,
+               version: float) -> Tuple[pd.DataFrame, Optional[str]]:
+    """One keyset page from the search endpoint plus the cursor of the page after it.
+
+    Pages are cached individually, so moving back and forth only hits the API
+    for pages not seen during the current refresh bucket.
+    """
+    params = {"query": query, "limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    with urllib.request.urlopen(f"{api_url}{API_SEARCH_PATH}?{urllib.parse.urlencode(params)}") as resp:
+        rows = json.load(resp)
+        next_cursor = resp.headers.get(API_CURSOR_HEADER)
+    return pd.DataFrame(rows), next_cursor
+
+def render_file_source(source: str) -> None:
+    version = _source_version(source)
+    all_columns = list_columns(source, version)
 
-# 1. Data Filter
-if os.path.exists(DATA_FILE):
-    df = pd.read_csv(DATA_FILE)
     st.sidebar.header("Filters")
-    if 'channel_name' in df.columns:
-        channels = ["All"] + list(df['channel_name'].unique())
-        choice = st.sidebar.selectbox("Channel Name", channels)
-        df_display = df if choice == "All" else df[df['channel_name'] == choice]
-    else:
-        df_display = df
+    shown = st.sidebar.multiselect("Columns", all_columns, default=all_columns)
+    df = load_frame(source, version, tuple(shown) if shown else None)
+
+    positions = None
+    if CHANNEL_COLUMN in all_columns:
+        index = channel_index(source, version)
+        choice = st.sidebar.selectbox("Channel Name", ["All"] + list(index))
+        positions = None if choice == "All" else index[choice]
+
+    # Render one explicit row window instead of shipping the whole frame to the browser
+    total = len(df) if positions is None else len(positions)
+    page_size = st.sidebar.selectbox("Rows per page", PAGE_SIZES, index=1)
+    page_count = max(math.ceil(total / page_size), 1)
+    page = st.sidebar.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+    start, end = (page - 1) * page_size, min(page * page_size, total)
+    window = df.iloc[start:end] if positions is None else df.iloc[positions[start:end]]
 
     st.subheader("📋 Scraped Data Overview")
-    st.dataframe(df_display, width='stretch')
+    st.caption(f"Rows {start + 1 if total else 0}–{end} of {total:,} (page {page} of {page_count})")
+    st.dataframe(window, width='stretch')
+
+def render_api_source(api_url: str) -> None:
+    st.sidebar.header("Filters")
+    query = st.sidebar.text_input("Search messages", value="")
+    page_size = st.sidebar.selectbox("Rows per page", [size for size in PAGE_SIZES if size <= API_MAX_PAGE_SIZE], index=1)
+
+    # Cursors of the pages visited so far; the last one is the page on screen.
+    # A new search or page size starts again from the first page.
+    if st.session_state.get("api_view") != (query, page_size):
+        st.session_state.api_view = (query, page_size)
+        st.session_state.api_cursors = [None]
+    cursors: List[Optional[str]] = st.session_state.api_cursors
+
+    page, next_cursor = fetch_page(api_url, query, cursors[-1], page_size, _source_version(api_url))
+    shown = st.sidebar.multiselect("Columns", list(page.columns), default=list(page.columns))
+
+    prev_col, next_col = st.sidebar.columns(2)
+    if prev_col.button("◀ Previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if next_col.button("Next ▶", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+
+    st.subheader("📋 Scraped Data Overview")
+    st.caption(f"Page {len(cursors)} · {len(page)} rows{'' if next_cursor else ' (last page)'}")
+    st.dataframe(page[shown] if shown else page, width='stretch')
+
+st.title("🏥 Ethiopian Medical Business Intelligence")
+
+# 1. Data Filter
+if API_URL:
+    render_api_source(API_URL)
+elif os.path.exists(DATA_FILE):
+    render_file_source(DATA_FILE)
 
 st.divider()
 
@@ -37,4 +139,4 @@ with col1:
     if os.path.exists(PLOT_GLOBAL): st.image(PLOT_GLOBAL, width='stretch')
 with col2:
     st.write("**Local Explanation (Sample 1)**")
-    if os.path.exists(PLOT_LOCAL): st.image(PLOT_GLOBAL, width='stretch')
\ No newline at end of file
+    if os.path.exists(PLOT_LOCAL): st.image(PLOT_GLOBAL, width='stretch')
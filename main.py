@@ -1,38 +1,398 @@
 import asyncio
+import argparse
+import glob
+import hashlib
+import json
 import os
+import time
 import logging
-import subprocess  # Added to run CLI commands like dbt
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
 from medical_warehouse.Scripts.scraper import TelegramScraper
 from medical_warehouse.Scripts.yolo_detect import YOLOAnalyzer
 from medical_warehouse.Scripts.load_to_postgres import TelegramDataLoader
 from medical_warehouse.Scripts.yolo_data_loader import YoloDataHandler
+from medical_warehouse.Scripts.lake import TelegramLake, MESSAGE_COLUMNS
 from medical_warehouse.Scripts.config import settings
+from medical_warehouse.Scripts.tracing import tracer, now_ns
+
+# --- Pipeline Constants ---
+DEFAULT_CHANNELS: List[str] = ['t.me/CheMed123', 'lobelia4cosmetics', '@tikvahpharma']
+QUEUE_MAXSIZE: int = 64          # Bounded queues: a slow consumer pauses its producer
+DETECTION_WORKERS: int = 1       # With more than one, each worker loads its own YOLO model
+DBT_PROJECT_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "medical_warehouse")
+STATE_FILE: str = os.path.join(settings.PROJECT.BASE_DATA_DIR, ".pipeline_state.json")
+DETECTIONS_FILE: str = "image_detections.csv"
+
+_DONE = object()  # Queue sentinel: the producer has finished
+
+
+@dataclass
+class StageStats:
+    """Busy time and throughput of one pipeline stage."""
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    skipped: bool = False
+    failed: int = 0              # Items that errored; a stage with failures isn't marked done
+
+    def record(self, seconds: float, items: int = 1) -> None:
+        now = time.perf_counter()
+        self.started = self.started or now - seconds
+        self.finished = now
+        self.busy_seconds += seconds
+        self.items += items
+        if tracer.enabled:
+            end = now_ns()
+            tracer.complete(f"pipeline.{self.name}", end - int(seconds * 1e9), end, self.name, items=items)
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.finished - self.started) if self.started and self.finished else 0.0
+
+
+@dataclass
+class PipelineRun:
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    fingerprints: Dict[str, Any] = field(default_factory=dict)
+    # Lake partitions (scrape_date=.../channel=...) or scraped channels whose rows reached Postgres
+    loaded: Set[str] = field(default_factory=set)
+
+    def stage(self, name: str) -> StageStats:
+        return self.stages.setdefault(name, StageStats(name))
+
+    def print_summary(self, total_seconds: float) -> None:
+        print(f"\n{'stage':<12}{'items':>8}{'busy s':>10}{'wall s':>10}{'failed':>8}")
+        for s in self.stages.values():
+            if s.skipped:
+                print(f"{s.name:<12}{'skipped':>8}")
+            else:
+                print(f"{s.name:<12}{s.items:>8}{s.busy_seconds:>10.2f}{s.wall_seconds:>10.2f}{s.failed:>8}")
+        busy = sum(s.busy_seconds for s in self.stages.values())
+        print(f"Total wall time {total_seconds:.2f}s (sum of stage busy time {busy:.2f}s)")
+
+
+# --- Stage-skip bookkeeping ---
+def _fingerprint(paths: Sequence[str]) -> str:
+    """Cheap change detector over file names, sizes and modification times."""
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        stat = os.stat(path)
+        digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _lake_root() -> str:
+    return os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.LAKE_SUBDIR)
+
 
-async def run_full_pipeline():
-    # ... (Phases 1 through 4 remain the same) ...
+def _partition_filters(partition: str) -> Tuple[str, str]:
+    """'scrape_date=2026-01-18/channel=CheMed123' -> ('2026-01-18', 'CheMed123')."""
+    scrape_date, channel = (part.split("=", 1)[1] for part in partition.split(os.sep))
+    return scrape_date, channel
 
-    # 5. Transform - Run dbt to clean and model the data
-    print("\n--- Phase 5: Running dbt Transformations ---")
+
+def _input_fingerprints() -> Dict[str, Any]:
+    """Image and model fingerprints, plus one per lake partition so only changed partitions reload."""
+    base = settings.PROJECT.BASE_DATA_DIR
+    images = glob.glob(os.path.join(base, settings.PROJECT.IMAGE_SUBDIR, "**", "*.jpg"), recursive=True)
+    lake = glob.glob(os.path.join(_lake_root(), "**", "*.parquet"), recursive=True)
+    models = glob.glob(os.path.join(DBT_PROJECT_DIR, "models", "**", "*.*"), recursive=True)
+
+    partitions: Dict[str, List[str]] = {}
+    for path in lake:
+        partitions.setdefault(os.path.relpath(os.path.dirname(path), _lake_root()), []).append(path)
+    detect, lake_digest = _fingerprint(images), _fingerprint(lake)
+    return {
+        "detect": detect,
+        "load": {partition: _fingerprint(files) for partition, files in partitions.items()},
+        "lake": lake_digest,
+        "models": _fingerprint(models),
+    }
+
+
+def _dbt_fingerprint(models: str, state: Dict[str, Any]) -> str:
+    """dbt reads what the warehouse holds, so it keys on the loads and detections that succeeded.
+
+    A partition or image batch that failed and is retried later changes this
+    digest once it lands, even though the files dbt would otherwise watch did not.
+    """
+    inputs = json.dumps({"models": models, "load": state.get("load", {}), "detect": state.get("detect")}, sort_keys=True)
+    return hashlib.sha1(inputs.encode("utf-8")).hexdigest()
+
+
+def _loaded_partitions(state: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, str]:
+    """Partition fingerprints already in Postgres, upgrading the old whole-lake state entry."""
+    loaded = state.get("load")
+    if isinstance(loaded, dict):
+        return loaded
+    # Older runs kept a single digest of every lake file; if it still matches, all are loaded
+    return dict(current["load"]) if loaded is not None and loaded == current["lake"] else {}
+
+
+def _read_state() -> Dict[str, Any]:
     try:
-        # We assume your dbt project is in a folder named 'dbt_project'
-        # Change 'cwd' to the actual path of your dbt folder
-        dbt_path = os.path.join(os.getcwd(), "medical_dbt") 
-        
-        result = subprocess.run(
-            ["dbt", "run"], 
-            cwd=dbt_path, 
-            capture_output=True, 
-            text=True
-        )
-        
-        if result.returncode == 0:
-            print("✅ dbt transformations completed successfully!")
-            print(result.stdout)
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _write_state(state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+# --- Producers ---
+async def scrape_stage(channels: Sequence[str], image_queue: asyncio.Queue,
+                       message_queue: asyncio.Queue, run: PipelineRun) -> None:
+    """Streams images and per-channel message batches downstream while scraping continues."""
+    stats = run.stage("scrape")
+    scraper = TelegramScraper()
+    await scraper.initialize()
+    async with scraper.client:
+        for channel in channels:
+            start = time.perf_counter()
+            messages = await scraper.scrape_channel(channel, image_queue=image_queue)
+            stats.record(time.perf_counter() - start, len(messages))
+            if messages:
+                await message_queue.put((messages[0].channel_name, [m.to_dict() for m in messages]))
+
+
+async def disk_image_stage(image_queue: asyncio.Queue) -> None:
+    """Feeds already-downloaded images when scraping is skipped."""
+    image_dir = os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.IMAGE_SUBDIR)
+    for img_path in glob.glob(os.path.join(image_dir, "**", "*.jpg"), recursive=True):
+        message_id = YOLOAnalyzer.message_id_from_path(img_path)
+        if message_id is not None:
+            await image_queue.put((message_id, img_path))
+
+
+async def lake_message_stage(message_queue: asyncio.Queue, partitions: Sequence[str]) -> None:
+    """Feeds the given lake partitions, one batch each, when scraping is skipped.
+
+    The raw table is append-only, so only partitions that are new or changed
+    since their last successful load are sent.
+    """
+    lake = TelegramLake()
+    for partition in sorted(partitions):
+        scrape_date, channel = _partition_filters(partition)
+        df = await asyncio.to_thread(lake.read, MESSAGE_COLUMNS, [scrape_date], [channel])
+        if not df.empty:
+            await message_queue.put((partition, df))
+
+
+# --- Consumers ---
+async def detect_worker(image_queue: asyncio.Queue, results: List[dict], run: PipelineRun,
+                        shared_model: bool = True) -> None:
+    stats = run.stage("detect")
+    # Weights load lazily inside the first to_thread inference call
+    analyzer = YOLOAnalyzer(shared=shared_model)
+    while (item := await image_queue.get()) is not _DONE:
+        message_id, img_path = item
+        start = time.perf_counter()
+        try:
+            # Inference is CPU/GPU bound; keep the event loop free for the scraper
+            results.extend(await asyncio.to_thread(analyzer.analyze_image, img_path, message_id))
+        except Exception as e:
+            logging.error(f"Detection failed for {img_path}: {e}")
+            stats.failed += 1
+        stats.record(time.perf_counter() - start)
+
+
+async def load_worker(message_queue: asyncio.Queue, run: PipelineRun) -> None:
+    stats = run.stage("load")
+    loader: Optional[TelegramDataLoader] = None
+    while (item := await message_queue.get()) is not _DONE:
+        source, batch = item
+        start = time.perf_counter()
+        loader = loader or await asyncio.to_thread(TelegramDataLoader)
+        try:
+            loaded = await asyncio.to_thread(loader.load_messages, batch)
+        except Exception as e:
+            logging.error(f"Loading {source} failed: {e}")
+            loaded = False
+        if loaded:
+            run.loaded.add(source)
         else:
-            print("❌ dbt failed!")
-            print(result.stderr)
-            
+            stats.failed += 1
+        stats.record(time.perf_counter() - start, len(batch))
+    if loader is not None:
+        await asyncio.to_thread(loader.apply_retention)
+
+
+async def _feed(producers: Sequence, sinks: Sequence[Tuple[asyncio.Queue, int]]) -> None:
+    """Runs the producers, then tells every consumer of each sink queue to stop."""
+    try:
+        await asyncio.gather(*producers)
+    finally:
+        for queue, consumers in sinks:
+            for _ in range(consumers):
+                await queue.put(_DONE)
+
+
+def save_detections(rows: List[dict], run: PipelineRun) -> Optional[str]:
+    """Merges new detections into image_detections.csv and uploads the result."""
+    import pandas as pd
+
+    if not rows:
+        return None
+    stats = run.stage("detect-load")
+    start = time.perf_counter()
+    csv_path = os.path.join(settings.PROJECT.BASE_DATA_DIR, DETECTIONS_FILE)
+    df = pd.DataFrame(rows)
+    if os.path.exists(csv_path):
+        # Keep earlier results for images that weren't re-detected in this run
+        previous = pd.read_csv(csv_path)
+        df = pd.concat([previous[~previous["image_path"].isin(df["image_path"])], df], ignore_index=True)
+    df.to_csv(csv_path, index=False)
+    uploaded = YoloDataHandler().upload_yolo_csv(csv_path, table_name=settings.PROJECT.ANALYSIS_TABLE,
+                                                 schema=settings.PROJECT.PROCESSED_SCHEMA)
+    if not uploaded:
+        stats.failed += 1
+    stats.record(time.perf_counter() - start, len(df))
+    return csv_path
+
+
+async def run_dbt(run: PipelineRun) -> bool:
+    stats = run.stage("dbt")
+    start = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "dbt", "run", "--profiles-dir", ".",
+            cwd=DBT_PROJECT_DIR,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
     except FileNotFoundError:
         print("⚠️ dbt command not found. Ensure dbt is installed in your .venv")
+        return False
+
+    stdout, stderr = await process.communicate()
+    stats.record(time.perf_counter() - start)
+    if process.returncode == 0:
+        print("✅ dbt transformations completed successfully!")
+        print(stdout.decode())
+        return True
+    print("❌ dbt failed!")
+    print(stderr.decode() or stdout.decode())
+    return False
+
+
+async def run_full_pipeline(channels: Optional[Sequence[str]] = None, force: bool = False,
+                            detection_workers: int = DETECTION_WORKERS,
+                            queue_size: int = QUEUE_MAXSIZE, export_marts: bool = False,
+                            trace_file: Optional[str] = None) -> PipelineRun:
+    """Runs scrape -> (detect || load) -> dbt with the stages connected by bounded queues.
+
+    With `channels`, images and message batches flow downstream while scraping
+    continues. Without, detection and loading read from disk and are skipped
+    when their inputs are unchanged since the last successful run. With
+    tracing enabled, a Chrome trace is written to `trace_file` at the end.
+    """
+    run = PipelineRun()
+    pipeline_start = time.perf_counter()
+    trace_start = now_ns()
+    state = {} if force else _read_state()
+    # Legacy JSON scrapes become lake partitions, so the load stage sees them too
+    json_dir = os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.JSON_SUBDIR)
+    await asyncio.to_thread(TelegramLake().import_json_tree, json_dir)
+    before = _input_fingerprints()
+    loaded_partitions = _loaded_partitions(state, before)
+
+    image_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    message_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    detections: List[dict] = []
+
+    image_sink, message_sink = (image_queue, detection_workers), (message_queue, 1)
+    tasks = []
+    if channels:
+        print(f"\n--- Streaming {len(channels)} channels into detection and loading ---")
+        tasks.append(_feed([scrape_stage(channels, image_queue, message_queue, run)], [image_sink, message_sink]))
+        run_detect = run_load = True
+    else:
+        run_detect = state.get("detect") != before["detect"]
+        changed = [p for p, digest in before["load"].items() if loaded_partitions.get(p) != digest]
+        run_load = bool(changed)
+        run.stage("detect").skipped = not run_detect
+        run.stage("load").skipped = not run_load
+        if run_detect:
+            tasks.append(_feed([disk_image_stage(image_queue)], [image_sink]))
+        if run_load:
+            tasks.append(_feed([lake_message_stage(message_queue, changed)], [message_sink]))
+
+    if run_detect:
+        tasks.extend(detect_worker(image_queue, detections, run, shared_model=detection_workers == 1)
+                     for _ in range(detection_workers))
+    if run_load:
+        tasks.append(load_worker(message_queue, run))
+    await asyncio.gather(*tasks)
+
+    await asyncio.to_thread(save_detections, detections, run)
+
+    # Inputs after scraping decide whether the warehouse models need a rebuild
+    after = _input_fingerprints()
+    # Only work that finished cleanly is marked done; failures are retried next run
+    detect_ok = not any(run.stages[name].failed for name in ("detect", "detect-load") if name in run.stages)
+    if not run.stage("detect").skipped and detect_ok:
+        state["detect"] = after["detect"]
+    for partition, digest in after["load"].items():
+        # Scraped batches are tagged by channel; the partitions they rewrote count as loaded
+        scraped = before["load"].get(partition) != digest and _partition_filters(partition)[1] in run.loaded
+        if partition in run.loaded or scraped:
+            loaded_partitions[partition] = digest
+    state["load"] = loaded_partitions
+    after["dbt"] = _dbt_fingerprint(after["models"], state)
+
+    print("\n--- Running dbt Transformations ---")
+    if state.get("dbt") == after["dbt"]:
+        run.stage("dbt").skipped = True
+        print("⏭️ Inputs unchanged since the last dbt run; skipping.")
+    elif await run_dbt(run):
+        state["dbt"] = after["dbt"]
+        if export_marts:
+            from medical_warehouse.Scripts.export_marts import MartExporter
+            exporter = MartExporter()
+            await asyncio.to_thread(exporter.export_all)
+            await asyncio.to_thread(exporter.verify)
+
+    _write_state(state)
+    run.fingerprints = after
+    run.print_summary(time.perf_counter() - pipeline_start)
+    if tracer.enabled:
+        tracer.complete("pipeline.run", trace_start, now_ns())
+        tracer.print_summary()
+        print(f"🧭 Trace written to {tracer.export_chrome(trace_file)} (open in ui.perfetto.dev)")
+    print("\n🚀 Full Pipeline (ELT) Execution Complete!")
+    return run
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the streaming ELT pipeline.")
+    parser.add_argument("--channels", nargs="*", default=DEFAULT_CHANNELS, help="Telegram channels to scrape")
+    parser.add_argument("--skip-scrape", action="store_true", help="Use images and lake data already on disk")
+    parser.add_argument("--force", action="store_true", help="Ignore stored fingerprints and rerun every stage")
+    parser.add_argument("--detect-workers", type=int, default=DETECTION_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_MAXSIZE)
+    parser.add_argument("--export-marts", action="store_true", help="Export marts to Parquet after dbt")
+    parser.add_argument("--trace", action="store_true", help="Record a Chrome/Perfetto trace of the run")
+    parser.add_argument("--trace-file", help="Trace output path (default: data/traces/trace-<time>.json)")
+    return parser.parse_args()
+
 
-    print("\n🚀 Full Pipeline (ELT) Execution Complete!")
\ No newline at end of file
+if __name__ == "__main__":
+    args = _parse_args()
+    if args.trace or args.trace_file:
+        tracer.enable()
+    asyncio.run(run_full_pipeline(
+        channels=None if args.skip_scrape else args.channels,
+        force=args.force,
+        detection_workers=args.detect_workers,
+        queue_size=args.queue_size,
+        export_marts=args.export_marts,
+        trace_file=args.trace_file,
+    ))
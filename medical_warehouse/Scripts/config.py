@@ -16,6 +16,10 @@ class ProjectConstants:
     )
     IMAGE_SUBDIR: str = "raw/images"
     JSON_SUBDIR: str = "raw/telegram_messages"
+    LAKE_SUBDIR: str = "lake/telegram_messages"
+    MARTS_SUBDIR: str = "marts"
+    BENCHMARK_SUBDIR: str = "benchmarks"
+    TRACE_SUBDIR: str = "traces"
     DEFAULT_MSG_LIMIT: int = 1000
 
 class Settings(BaseSettings):
@@ -31,6 +35,14 @@ class Settings(BaseSettings):
     DB_PORT: str = "5432"
     DB_NAME: str = "medical_warehouse"
 
+    # Raw message partitions older than this many months are removed (0 keeps everything)
+    RAW_RETENTION_MONTHS: int = 0
+    # "detach" keeps old partitions as standalone *_detached_YYYYMM tables; "drop" deletes them
+    RAW_RETENTION_MODE: str = "detach"
+
+    # Record spans for a Chrome/Perfetto trace (also switched on by main.py --trace)
+    PIPELINE_TRACE: bool = False
+
     # Attach constants
     PROJECT: ProjectConstants = ProjectConstants()
 
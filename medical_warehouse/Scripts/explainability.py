@@ -1,51 +1,193 @@
-import shap
-import matplotlib.pyplot as plt
 import pandas as pd
 import joblib
+import hashlib
+import json
 import os
 import numpy as np
+from typing import Any, Dict, Tuple
+from medical_warehouse.Scripts.lake import read_table
+
+FEATURES = ['n_persons', 'n_bottles', 'n_pills', 'view_count']
+DEFAULT_CHUNK_SIZE = 5000
+CACHE_SUBDIR = ".shap_cache"
+RENDER_STATE_FILE = "render_state.json"
+BACKGROUND_FILE = "background_{key}.npz"
+SUMMARY_PLOT = "shap_summary_plot.png"
+LOCAL_PLOT = "shap_local_prediction.png"
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _row_hashes(X):
+    # SHAP values depend only on the feature values, so identical rows share a cache entry
+    return pd.util.hash_pandas_object(X, index=False).to_numpy(dtype=np.uint64)
+
+
+def _sample_rows(df, sample_size, stratify_by, random_state):
+    """Stratified (or plain) sample; a fixed seed keeps the sample stable across runs."""
+    if not sample_size or sample_size >= len(df):
+        return df
+    if stratify_by and stratify_by in df.columns:
+        frac = sample_size / len(df)
+        return df.groupby(stratify_by, group_keys=False).sample(frac=frac, random_state=random_state)
+    return df.sample(n=sample_size, random_state=random_state)
+
+
+def _select_output(values, base_values):
+    # For multiclass/binary models explain class 1: [rows, features, class 1]
+    if values.ndim == 3:
+        values, base_values = values[:, :, 1], base_values[:, 1]
+    return values, float(np.ravel(base_values)[0])
+
+
+def _explain_chunk(model, background, X_chunk) -> Tuple[np.ndarray, float]:
+    import shap
+
+    if background is None:
+        explainer = shap.TreeExplainer(model)
+    else:
+        explainer = shap.TreeExplainer(model, data=background, feature_perturbation="interventional")
+    explanation = explainer(X_chunk)
+    return _select_output(np.asarray(explanation.values), np.asarray(explanation.base_values))
+
+
+def _load_cache(path):
+    if path is None or not os.path.exists(path):
+        return np.empty(0, dtype=np.uint64), np.empty((0, len(FEATURES))), None
+    with np.load(path) as cache:
+        return cache["row_hashes"], cache["values"], float(cache["base_value"])
+
+
+def _background_sample(X, background_size, random_state, path):
+    """Samples the interventional background once and reuses it on later runs.
+
+    The background is part of the SHAP cache key, so resampling it from each
+    data update would invalidate every cached row.
+    """
+    if path is not None and os.path.exists(path):
+        with np.load(path) as stored:
+            return pd.DataFrame(stored["values"], columns=list(stored["columns"]))
+    import shap
+
+    background = shap.sample(X, background_size, random_state=random_state)
+    if path is not None:
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, values=background.to_numpy(), columns=np.array(background.columns, dtype=str))
+        os.replace(tmp_path, path)
+    return background
+
+
+def _save_cache(path, row_hashes, values, base_value):
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, row_hashes=row_hashes, values=values, base_value=base_value)
+    os.replace(tmp_path, path)
+
+
+def generate_model_explanations(model_path, X_test_path, output_dir, sample_size=None,
+                                stratify_by=None, background_size=None, n_jobs=1,
+                                chunk_size=DEFAULT_CHUNK_SIZE, cache_dir=None,
+                                use_cache=True, random_state=42) -> Dict[str, Any]:
+    """Renders SHAP summary and waterfall plots, reusing cached values where possible.
+
+    SHAP values are persisted per row under a key made of the model file hash and
+    the background sample, so after a data update only unseen rows are explained.
+    Plots are re-rendered only when the explained rows change. `sample_size`
+    limits the explained rows (stratified on `stratify_by` when given), and
+    `background_size` switches to interventional SHAP over a sampled background.
+    """
+    # shap (and matplotlib through it) takes seconds to import; only pay for it when explaining
+    import shap
+    import matplotlib.pyplot as plt
 
-def generate_model_explanations(model_path, X_test_path, output_dir):
     os.makedirs(output_dir, exist_ok=True)
-    
-    # Load model and data
+    cache_dir = cache_dir or os.path.join(output_dir, CACHE_SUBDIR)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Load model and data; only the model features (and the strata column) are read
     model = joblib.load(model_path)
-    df = pd.read_csv(X_test_path)
-    
-    # Strictly define features to ensure alignment
-    features = ['n_persons', 'n_bottles', 'n_pills', 'view_count']
-    X_numeric = df[features]
-
-    # 1. Initialize Explainer
-    explainer = shap.TreeExplainer(model)
-    
-    # 2. Get SHAP values
-    # We use the newer 'Explanation' object format which waterfall plots prefer
-    explanation = explainer(X_numeric)
-
-    # If it's a multiclass/binary model, we need to select class 1
-    # explanation[:, :, 1] means: [all rows, all features, class 1]
-    if len(explanation.shape) == 3:
-        exp_to_plot = explanation[0, :, 1]  # Select first row, class 1
-        shap_values_global = explanation.values[:, :, 1]
-    else:
-        exp_to_plot = explanation[0, :]     # Single output model
-        shap_values_global = explanation.values
+    columns = FEATURES + ([stratify_by] if stratify_by and stratify_by not in FEATURES else [])
+    df = _sample_rows(read_table(X_test_path, columns=columns), sample_size, stratify_by, random_state)
+    X_numeric = df[FEATURES].reset_index(drop=True)
+
+    model_hash = _file_hash(model_path)
+    background = None
+    background_key = "tree_path_dependent"
+    if background_size:
+        sample_key = hashlib.sha256(f"{model_hash}|{background_size}|{random_state}".encode()).hexdigest()[:16]
+        background_path = os.path.join(cache_dir, BACKGROUND_FILE.format(key=sample_key)) if use_cache else None
+        background = _background_sample(X_numeric, background_size, random_state, background_path)
+        background_key = hashlib.sha256(_row_hashes(background).tobytes()).hexdigest()
+
+    cache_key = hashlib.sha256(f"{model_hash}|{background_key}".encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"{cache_key}.npz")
+    cached_hashes, cached_values, base_value = _load_cache(cache_path if use_cache else None)
+
+    # 1. Explain only rows whose values have not been seen with this model before
+    row_hashes = _row_hashes(X_numeric)
+    known = np.isin(row_hashes, cached_hashes)
+    _, new_positions = np.unique(row_hashes[~known], return_index=True)
+    X_new = X_numeric[~known].iloc[np.sort(new_positions)]
+
+    if len(X_new):
+        chunks = [X_new.iloc[i:i + chunk_size] for i in range(0, len(X_new), chunk_size)]
+        if n_jobs == 1 or len(chunks) == 1:
+            results = [_explain_chunk(model, background, chunk) for chunk in chunks]
+        else:
+            results = joblib.Parallel(n_jobs=n_jobs)(
+                joblib.delayed(_explain_chunk)(model, background, chunk) for chunk in chunks
+            )
+        base_value = results[0][1]
+        cached_hashes = np.concatenate([cached_hashes, _row_hashes(X_new)])
+        cached_values = np.vstack([cached_values] + [values for values, _ in results])
+        if use_cache:
+            _save_cache(cache_path, cached_hashes, cached_values, base_value)
+
+    # 2. Gather values for every explained row from the (now complete) cache
+    order = np.argsort(cached_hashes)
+    positions = order[np.searchsorted(cached_hashes, row_hashes, sorter=order)]
+    shap_values_global = cached_values[positions]
+
+    summary = {"rows": len(X_numeric), "computed": len(X_new), "cached": int(known.sum()), "rendered": False}
+
+    # Skip re-rendering when neither the model nor the explained rows changed
+    data_hash = hashlib.sha256(row_hashes.tobytes()).hexdigest()
+    state_path = os.path.join(cache_dir, RENDER_STATE_FILE)
+    render_state = {"cache_key": cache_key, "data_hash": data_hash}
+    plots = [os.path.join(output_dir, SUMMARY_PLOT), os.path.join(output_dir, LOCAL_PLOT)]
+    if use_cache and all(os.path.exists(p) for p in plots) and os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            if json.load(f) == render_state:
+                return summary
 
     # --- 3. Global Summary Plot ---
     plt.figure(figsize=(10, 6))
     shap.summary_plot(shap_values_global, X_numeric, show=False)
-    plt.savefig(os.path.join(output_dir, "shap_summary_plot.png"), bbox_inches='tight')
+    plt.savefig(plots[0], bbox_inches='tight')
     plt.close()
 
-    # --- 4. Local Waterfall Plot (REPLACED Force Plot for Stability) ---
+    # --- 4. Local Waterfall Plot (first explained row) ---
     plt.figure(figsize=(10, 6))
-    # Waterfall plot automatically handles base_value + shap_values + feature_names
+    exp_to_plot = shap.Explanation(
+        values=shap_values_global[0],
+        base_values=base_value,
+        data=X_numeric.iloc[0].to_numpy(),
+        feature_names=FEATURES,
+    )
     shap.plots.waterfall(exp_to_plot, show=False)
-    
-    plt.savefig(os.path.join(output_dir, "shap_local_prediction.png"), bbox_inches='tight')
+    plt.savefig(plots[1], bbox_inches='tight')
     plt.close()
 
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(render_state, f)
+    summary["rendered"] = True
+    return summary
+
 if __name__ == "__main__":
     from medical_warehouse.Scripts.config import settings
     MODEL = os.path.join(settings.PROJECT.BASE_DATA_DIR, "models", "yolo_classifier.joblib")
@@ -54,7 +196,7 @@ if __name__ == "__main__":
 
     print("📊 Generating SHAP Waterfall and Summary plots...")
     if os.path.exists(MODEL) and os.path.exists(DATA):
-        generate_model_explanations(MODEL, DATA, OUT)
-        print(f"✅ Success! Results in {OUT}")
+        result = generate_model_explanations(MODEL, DATA, OUT)
+        print(f"✅ Success! {result['computed']} rows explained, {result['cached']} from cache. Results in {OUT}")
     else:
-        print("❌ Error: Missing files. Run temp_setup.py first.")
\ No newline at end of file
+        print("❌ Error: Missing files. Run temp_setup.py first.")
@@ -0,0 +1,68 @@
+import os
+import logging
+from typing import Dict, Optional
+
+import pandas as pd
+from sqlalchemy import text, create_engine, Engine
+from .config import settings
+
+# --- Constants ---
+PARQUET_COMPRESSION: str = "zstd"
+
+
+class MartExporter:
+    """Snapshots the dbt mart tables to Parquet for the API's columnar backend."""
+
+    def __init__(self, engine: Optional[Engine] = None, marts_dir: Optional[str] = None) -> None:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        self.engine: Engine = engine or create_engine(settings.DATABASE_URL)
+        self.marts_dir: str = marts_dir or os.path.join(
+            settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.MARTS_SUBDIR
+        )
+
+    def export_table(self, schema: str, table: str) -> str:
+        """Writes one table to <marts_dir>/<schema>/<table>.parquet atomically."""
+        from app.db.columnar import mart_path
+
+        output_path = mart_path(schema, table, self.marts_dir)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        # read_sql_query keeps DATE columns as dates (read_sql_table widens them to timestamps)
+        with self.engine.connect() as conn:
+            df = pd.read_sql_query(text(f"SELECT * FROM {schema}.{table}"), conn)
+        # Readers may be querying the current file; swap the new one in only once complete
+        tmp_path = f"{output_path}.tmp"
+        df.to_parquet(tmp_path, index=False, compression=PARQUET_COMPRESSION)
+        os.replace(tmp_path, output_path)
+
+        logging.info(f"📦 Exported {len(df)} rows from {schema}.{table} to {output_path}")
+        return output_path
+
+    def export_all(self) -> Dict[str, str]:
+        from app.db.columnar import MART_TABLES
+
+        return {f"{schema}.{table}": self.export_table(schema, table) for schema, table in MART_TABLES}
+
+    def verify(self) -> bool:
+        """Checks that every report endpoint returns the same answer from both backends."""
+        from sqlalchemy.orm import Session
+        from app.db import columnar
+
+        columnar_session = columnar.ColumnarSession(self.marts_dir)
+        try:
+            with Session(self.engine) as pg_session:
+                mismatches = columnar.verify_parity(pg_session, columnar_session)
+        finally:
+            columnar_session.close()
+
+        if mismatches:
+            logging.error(f"❌ Columnar results differ from Postgres for: {', '.join(mismatches)}")
+            return False
+        logging.info("✅ Columnar results match Postgres for all report endpoints.")
+        return True
+
+
+if __name__ == "__main__":
+    exporter = MartExporter()
+    exporter.export_all()
+    exporter.verify()
@@ -0,0 +1,144 @@
+import os
+import glob
+import json
+import logging
+from dataclasses import fields
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Union, get_args, get_type_hints
+
+from .config import settings
+from .schemas import TelegramMessage
+
+if TYPE_CHECKING:  # pandas/pyarrow are imported on first read or write
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+# --- Constants ---
+PARQUET_COMPRESSION: str = "zstd"
+PART_FILE_NAME: str = "part-0.parquet"
+MESSAGE_COLUMNS: List[str] = [f.name for f in fields(TelegramMessage)]
+# 'channel' rather than 'channel_name' so the partition key never shadows the record field
+PARTITION_COLUMNS: List[str] = ["scrape_date", "channel"]
+
+
+def _arrow_type(py_type: Any) -> "pa.DataType":
+    """Maps a dataclass annotation (including Optional[...]) to an Arrow type."""
+    import pyarrow as pa
+
+    arrow_types: Dict[type, pa.DataType] = {int: pa.int64(), str: pa.string(), bool: pa.bool_()}
+    args = [arg for arg in get_args(py_type) if arg is not type(None)]
+    return arrow_types[args[0] if args else py_type]
+
+
+@lru_cache(maxsize=None)
+def message_schema() -> "pa.Schema":
+    """Derives the Parquet schema from schemas.TelegramMessage so the two never drift."""
+    import pyarrow as pa
+
+    hints = get_type_hints(TelegramMessage)
+    return pa.schema([(f.name, _arrow_type(hints[f.name])) for f in fields(TelegramMessage)])
+
+
+@lru_cache(maxsize=None)
+def partition_schema() -> "pa.Schema":
+    import pyarrow as pa
+
+    return pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS])
+
+
+class TelegramLake:
+    """Parquet store for TelegramMessage records, partitioned by scrape date and channel."""
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        self.root: str = root or os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.LAKE_SUBDIR)
+
+    def partition_path(self, scrape_date: str, channel: str) -> str:
+        return os.path.join(self.root, f"scrape_date={scrape_date}", f"channel={channel}", PART_FILE_NAME)
+
+    def write_partition(self, messages: Iterable[Union[TelegramMessage, Dict[str, Any]]],
+                        scrape_date: str, channel: str) -> str:
+        """Replaces the (scrape_date, channel) partition; raises if a record violates the schema."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = [m.to_dict() if isinstance(m, TelegramMessage) else m for m in messages]
+        table = pa.Table.from_pylist(rows, schema=message_schema())
+
+        output_path = self.partition_path(scrape_date, channel)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        # Write aside and swap so concurrent readers never see a half-written file;
+        # dot-prefixed files are skipped by dataset discovery.
+        tmp_path = os.path.join(os.path.dirname(output_path), f".{PART_FILE_NAME}.tmp")
+        pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+        os.replace(tmp_path, output_path)
+
+        logging.info(f"🗂️ Wrote {table.num_rows} messages to {output_path}")
+        return output_path
+
+    def import_json_tree(self, json_dir: str) -> List[str]:
+        """One-off migration of the legacy <json_dir>/<date>/<channel>.json files into the lake.
+
+        Each file becomes the (date, channel) partition unless that partition
+        already exists, so running it again is a no-op.
+        """
+        written: List[str] = []
+        for file_path in sorted(glob.glob(os.path.join(json_dir, "**", "*.json"), recursive=True)):
+            scrape_date = os.path.basename(os.path.dirname(file_path))
+            channel = os.path.splitext(os.path.basename(file_path))[0]
+            if os.path.exists(self.partition_path(scrape_date, channel)):
+                continue
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                records = data if isinstance(data, list) else [data]
+                rows = [{name: record.get(name) for name in MESSAGE_COLUMNS} for record in records]
+                written.append(self.write_partition(rows, scrape_date=scrape_date, channel=channel))
+            except (json.JSONDecodeError, OSError, ValueError, TypeError) as e:
+                logging.error(f"❌ Skipping legacy file {file_path}: {e}")
+        if written:
+            logging.info(f"📦 Migrated {len(written)} legacy JSON files into the lake.")
+        return written
+
+    def read(self, columns: Optional[Sequence[str]] = None,
+             scrape_dates: Optional[Sequence[str]] = None,
+             channels: Optional[Sequence[str]] = None,
+             where: Optional["ds.Expression"] = None) -> "pd.DataFrame":
+        """Reads only the requested columns from the partitions matching the filters.
+
+        `where` is an extra pyarrow expression (e.g. ds.field("has_media") == True)
+        pushed down to row-group statistics inside the surviving files.
+        """
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        selected = list(columns) if columns else MESSAGE_COLUMNS
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=selected)
+
+        dataset = ds.dataset(
+            self.root,
+            schema=pa.unify_schemas([message_schema(), partition_schema()]),
+            format="parquet",
+            partitioning=ds.partitioning(partition_schema(), flavor="hive"),
+        )
+
+        # Partition filters prune whole directories before any file is opened
+        predicate = where
+        for key, values in (("scrape_date", scrape_dates), ("channel", channels)):
+            if values:
+                clause = ds.field(key).isin(list(values))
+                predicate = clause if predicate is None else predicate & clause
+
+        return dataset.to_table(columns=selected, filter=predicate).to_pandas()
+
+
+def read_table(path: str, columns: Optional[Sequence[str]] = None) -> "pd.DataFrame":
+    """Loads a CSV or Parquet file, materialising only the requested columns."""
+    import pandas as pd
+
+    usecols = list(columns) if columns else None
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=usecols)
+    return pd.read_csv(path, usecols=usecols)
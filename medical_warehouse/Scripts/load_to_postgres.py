@@ -1,25 +1,75 @@
 import os
+import re
 import json
 import glob
 import logging
-import pandas as pd
-from typing import List, Dict, Any, Optional
-from sqlalchemy import text, create_engine, Engine
+from datetime import date, datetime, timezone
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Sequence, Union
+from sqlalchemy import text, create_engine, Engine, Connection
 from .config import settings
+from .lake import TelegramLake, MESSAGE_COLUMNS
+from .tracing import tracer, traced
+
+if TYPE_CHECKING:  # pandas is imported when data is first uploaded
+    import pandas as pd
 
 # --- Constants for Engineering Excellence ---
 DB_AUTOCOMMIT_LEVEL: str = "AUTOCOMMIT"
 JSON_SEARCH_PATTERN: str = "**/*.json"
 
+# Column types of the month-partitioned raw messages table (mirrors schemas.TelegramMessage)
+RAW_COLUMN_TYPES: Dict[str, str] = {
+    "message_id": "BIGINT",
+    "channel_name": "TEXT",
+    "message_text": "TEXT",
+    "views": "INTEGER",
+    "forwards": "INTEGER",
+    "message_date": "TIMESTAMPTZ",
+    "has_media": "BOOLEAN",
+    "image_path": "TEXT",
+}
+PARTITION_KEY: str = "message_date"
+RETENTION_MODES = ("detach", "drop")
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _detached_name(table: str, month: date) -> str:
+    # Detached partitions are renamed so the _pYYYYMM name is free if that month is loaded again
+    return f"{table}_detached_{month:%Y%m}"
+
+
+def _retention_cutoff(months: int) -> Optional[date]:
+    """First month kept by a `months`-long retention window (None keeps everything)."""
+    if months <= 0:
+        return None
+    return _add_months(_month_start(datetime.now(timezone.utc).date()), -(months - 1))
+
 class TelegramDataLoader:
     def __init__(self) -> None:
-        """Initializes the loader and ensures the database exists."""
+        """Initializes the loader; the database is only contacted on first use."""
         self._setup_logging()
-        self._ensure_database_exists()
-        
-        # Create engine using the dataclass settings
-        self.engine: Engine = create_engine(settings.DATABASE_URL)
+
+    @cached_property
+    def engine(self) -> Engine:
+        """Ensures the database exists, then creates the engine from the dataclass settings."""
+        with tracer.span("load.ensure_database", "load"):
+            self._ensure_database_exists()
+        engine = create_engine(settings.DATABASE_URL)
         logging.info(f"Loader initialized for database: {settings.DB_NAME}")
+        return engine
 
     def _setup_logging(self) -> None:
         """Extracts reusable logging logic into a utility function."""
@@ -60,7 +110,8 @@ class TelegramDataLoader:
 
         for file_path in files:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
+                with open(file_path, 'r', encoding='utf-8') as f, \
+                        tracer.span("load.parse_json", "load", file=os.path.basename(file_path)):
                     data = json.load(f)
                     if isinstance(data, list):
                         all_messages.extend(data)
@@ -72,13 +123,15 @@ class TelegramDataLoader:
         logging.info(f"📊 Read {len(all_messages)} records from local files.")
         return all_messages
 
-    def upload_to_postgres(self, data: List[Dict[str, Any]], table_name: str, schema: str) -> None:
-        """Uploads data to PostgreSQL and ensures the schema exists."""
-        if not data:
+    def upload_to_postgres(self, data: Union["pd.DataFrame", List[Dict[str, Any]]], table_name: str, schema: str) -> bool:
+        """Uploads data to PostgreSQL and ensures the schema exists; returns False if the upload failed."""
+        import pandas as pd
+
+        if data is None or len(data) == 0:
             logging.warning("🛑 No data to upload.")
-            return
+            return True
 
-        df = pd.DataFrame(data)
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
         
         try:
             with self.engine.connect() as conn:
@@ -86,33 +139,172 @@ class TelegramDataLoader:
                 conn.commit()
                 logging.info(f"📂 Schema '{schema}' verified.")
 
-            df.to_sql(
-                table_name, 
-                con=self.engine, 
-                schema=schema, 
-                if_exists='append', 
-                index=False
-            )
+            with tracer.span("load.to_sql", "load", table=f"{schema}.{table_name}", rows=len(df)):
+                df.to_sql(
+                    table_name, 
+                    con=self.engine, 
+                    schema=schema, 
+                    if_exists='append', 
+                    index=False
+                )
             logging.info(f"✅ Loaded {len(df)} records into {schema}.{table_name}")
+            return True
             
         except Exception as e:
             logging.error(f"🔥 Upload failed: {e}")
+            return False
 
-    def run_pipeline(self) -> None:
-        """Executes the full process using the ProjectConstants dataclass."""
-        # Dynamically build path from config
-        source_path = os.path.join(
-            settings.PROJECT.BASE_DATA_DIR, 
-            settings.PROJECT.JSON_SUBDIR
-        )
-        
-        data = self.load_json_files(source_path)
-        if data:
-            self.upload_to_postgres(
-                data=data, 
-                table_name=settings.PROJECT.MSG_TABLE, 
-                schema=settings.PROJECT.RAW_SCHEMA
-            )
+    # --- Month-partitioned raw table ---
+    def _relation_kind(self, conn: Connection, schema: str, table: str) -> Optional[str]:
+        """Returns pg_class.relkind: 'p' partitioned, 'r' plain table, None if missing."""
+        query = text("""
+            SELECT c.relkind FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :schema AND c.relname = :table
+        """)
+        return conn.execute(query, {"schema": schema, "table": table}).scalar()
+
+    def _attached_partitions(self, conn: Connection, schema: str, table: str) -> List[str]:
+        return conn.execute(text("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            JOIN pg_namespace n ON n.oid = p.relnamespace
+            WHERE n.nspname = :schema AND p.relname = :table
+        """), {"schema": schema, "table": table}).scalars().all()
+
+    def _create_month_partitions(self, conn: Connection, schema: str, table: str, months: Sequence[date]) -> None:
+        attached = set(self._attached_partitions(conn, schema, table))
+        for month in sorted(set(months)):
+            name = _partition_name(table, month)
+            if name in attached:
+                continue
+            if self._relation_kind(conn, schema, name) is not None:
+                # A standalone table left by an older detach holds the name; move it aside
+                # rather than let the month's rows fall through to the DEFAULT partition
+                conn.execute(text(f"ALTER TABLE {schema}.{name} RENAME TO {_detached_name(table, month)}"))
+            # Bounds are pinned to UTC so they don't depend on the session TimeZone
+            conn.execute(text(
+                f"CREATE TABLE {schema}.{name} "
+                f"PARTITION OF {schema}.{table} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{_add_months(month, 1).isoformat()} 00:00+00')"
+            ))
+
+    def _ensure_partitioned_table(self, conn: Connection, schema: str, table: str) -> None:
+        """Creates the RANGE(message_date) parent, converting a legacy unpartitioned table."""
+        kind = self._relation_kind(conn, schema, table)
+        if kind == "p":
+            return
+
+        legacy = f"{table}_legacy"
+        if kind is not None:
+            logging.info(f"🔁 Converting {schema}.{table} to a month-partitioned table...")
+            conn.execute(text(f"ALTER TABLE {schema}.{table} RENAME TO {legacy}"))
+
+        columns = ", ".join(f"{name} {sql_type}" for name, sql_type in RAW_COLUMN_TYPES.items())
+        conn.execute(text(f"CREATE TABLE {schema}.{table} ({columns}) PARTITION BY RANGE ({PARTITION_KEY})"))
+        # Rows without a date can't be routed to a month; they land here
+        conn.execute(text(f"CREATE TABLE {schema}.{table}_default PARTITION OF {schema}.{table} DEFAULT"))
+
+        if kind is not None:
+            months = conn.execute(text(
+                f"SELECT DISTINCT date_trunc('month', {PARTITION_KEY}::timestamptz AT TIME ZONE 'UTC')::date "
+                f"FROM {schema}.{legacy} WHERE {PARTITION_KEY} IS NOT NULL"
+            )).scalars().all()
+            self._create_month_partitions(conn, schema, table, months)
+            casts = ", ".join(f"{name}::{sql_type}" for name, sql_type in RAW_COLUMN_TYPES.items())
+            conn.execute(text(
+                f"INSERT INTO {schema}.{table} ({', '.join(RAW_COLUMN_TYPES)}) SELECT {casts} FROM {schema}.{legacy}"
+            ))
+            logging.info(f"📦 Copied legacy rows; {schema}.{legacy} kept for manual cleanup.")
+
+    def load_messages(self, data: Union["pd.DataFrame", List[Dict[str, Any]]]) -> bool:
+        """Appends messages to the raw table, creating any missing month partitions first.
+
+        Rows older than the retention window are skipped, so reloading the lake
+        doesn't bring back months that retention already removed. Returns
+        False if the upload failed.
+        """
+        import pandas as pd
+
+        df = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        if df.empty:
+            logging.warning("🛑 No data to upload.")
+            return True
+
+        schema, table = settings.PROJECT.RAW_SCHEMA, settings.PROJECT.MSG_TABLE
+        df[PARTITION_KEY] = pd.to_datetime(df[PARTITION_KEY], utc=True, errors="coerce", format="ISO8601")
+        cutoff = _retention_cutoff(settings.RAW_RETENTION_MONTHS)
+        if cutoff is not None:
+            expired = df[PARTITION_KEY] < pd.Timestamp(cutoff, tz="UTC")
+            if expired.any():
+                logging.info(f"⏳ Skipping {int(expired.sum())} messages older than the retention window ({cutoff}).")
+                df = df[~expired]
+            if df.empty:
+                return True
+        periods = df[PARTITION_KEY].dropna().dt.tz_localize(None).dt.to_period("M").unique()
+        months = [date(period.year, period.month, 1) for period in periods]
+
+        with tracer.span("load.prepare_partitions", "load", months=len(months)), self.engine.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema};"))
+            self._ensure_partitioned_table(conn, schema, table)
+            self._create_month_partitions(conn, schema, table, months)
+
+        return self.upload_to_postgres(data=df, table_name=table, schema=schema)
+
+    @traced("load.retention", "load")
+    def apply_retention(self, months: Optional[int] = None, mode: Optional[str] = None) -> List[str]:
+        """Detaches or drops month partitions older than the retention window.
+
+        Keeps the current month plus `months - 1` previous ones. Removing a
+        partition is a catalog operation, unlike a DELETE over the same rows.
+        Detached partitions are renamed to <table>_detached_YYYYMM.
+        """
+        months = settings.RAW_RETENTION_MONTHS if months is None else months
+        mode = mode or settings.RAW_RETENTION_MODE
+        if months <= 0:
+            return []
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"Unknown retention mode '{mode}', expected one of {RETENTION_MODES}")
+
+        schema, table = settings.PROJECT.RAW_SCHEMA, settings.PROJECT.MSG_TABLE
+        cutoff = _retention_cutoff(months)
+        name_pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+        removed: List[str] = []
+
+        with self.engine.begin() as conn:
+            for child in sorted(self._attached_partitions(conn, schema, table)):
+                match = name_pattern.match(child)
+                if not match:
+                    continue
+                month = date(int(match.group(1)), int(match.group(2)), 1)
+                if month >= cutoff:
+                    continue
+                if mode == "detach":
+                    conn.execute(text(f"ALTER TABLE {schema}.{table} DETACH PARTITION {schema}.{child}"))
+                    conn.execute(text(f"ALTER TABLE {schema}.{child} RENAME TO {_detached_name(table, month)}"))
+                else:
+                    conn.execute(text(f"DROP TABLE {schema}.{child}"))
+                removed.append(child)
+
+        if removed:
+            logging.info(f"🧹 Retention ({mode}, {months} months): {', '.join(removed)}")
+        return removed
+
+    def run_pipeline(self, scrape_dates: Optional[Sequence[str]] = None,
+                     channels: Optional[Sequence[str]] = None) -> None:
+        """Executes the full process using the ProjectConstants dataclass.
+
+        Only the raw-table columns of the requested lake partitions are read;
+        with no filters every partition is loaded. Files from the legacy JSON
+        tree are migrated into the lake first, so both sources are covered.
+        """
+        lake = TelegramLake()
+        lake.import_json_tree(os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.JSON_SUBDIR))
+        data = lake.read(columns=MESSAGE_COLUMNS, scrape_dates=scrape_dates, channels=channels)
+
+        self.load_messages(data)
+        self.apply_retention()
 
 if __name__ == "__main__":
     loader = TelegramDataLoader()
@@ -1,17 +1,21 @@
 import os
-import json
 import logging
 import asyncio
 from datetime import datetime
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
-from telethon import TelegramClient, errors
 from .config import settings
 from .schemas import TelegramMessage
+from .lake import TelegramLake
+from .tracing import tracer, now_ns
+
+if TYPE_CHECKING:  # telethon is imported when the client is first initialized
+    from telethon import TelegramClient
 
 # Constants
 FLOOD_THRESHOLD_SECONDS: int = 86400  # 24 hours
 TARGET_MSG_LIMIT: int = 1000          # The number of messages you want per channel
+FETCH_SPAN_MIN_NS: int = 1_000_000    # Waits shorter than 1ms are served from Telethon's buffer, not the network
 START_DATE_STR: str = "2026-01-18"
 class TelegramScraper:
     def __init__(self, session_name: str = 'scraper_session') -> None:
@@ -19,7 +23,8 @@ class TelegramScraper:
         self.api_id: int = int(settings.API_ID)
         self.api_hash: str = settings.API_HASH
         self.session_name: str = session_name
-        self.client: Optional[TelegramClient] = None
+        self.client: Optional["TelegramClient"] = None
+        self.lake: TelegramLake = TelegramLake()
         
         self._setup_logging()
 
@@ -37,6 +42,7 @@ class TelegramScraper:
     async def initialize(self) -> None:
         """Initializes the Telegram Client session."""
         if not self.client:
+            from telethon import TelegramClient
             session_path = os.path.join(os.path.dirname(__file__), "..", self.session_name)
             self.client = TelegramClient(session_path, self.api_id, self.api_hash)
             self.client.flood_sleep_threshold = FLOOD_THRESHOLD_SECONDS
@@ -52,9 +58,16 @@ class TelegramScraper:
             .strip()
         )
 
-    async def scrape_channel(self, channel_username: str) -> None:
-        """Extracts exactly 1000 messages from the channel."""
+    async def scrape_channel(self, channel_username: str,
+                             image_queue: Optional[asyncio.Queue] = None) -> List[TelegramMessage]:
+        """Extracts exactly 1000 messages from the channel.
+
+        When `image_queue` is given, each saved image is put on it as
+        (message_id, path) as soon as it is on disk, so detection can start
+        while the channel is still being scraped. A full queue pauses scraping.
+        """
         await self.initialize()
+        from telethon import errors
         
         clean_name = self.clean_username(channel_username)
         
@@ -63,19 +76,19 @@ class TelegramScraper:
         
         # Build paths using the settings config
         image_dir = os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.IMAGE_SUBDIR, clean_name)
-        json_dir = os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.JSON_SUBDIR, date_folder)
-        
         os.makedirs(image_dir, exist_ok=True)
-        os.makedirs(json_dir, exist_ok=True)
 
-        messages_data: List[dict] = []
+        messages_data: List[TelegramMessage] = []
         images_downloaded: int = 0
         
         print(f"🚀 Scraping {TARGET_MSG_LIMIT} messages for: {channel_username}...")
 
         try:
             # Task 2 Logic: Use the 'limit' parameter to get 1000 messages
+            fetch_start = now_ns()
             async for message in self.client.iter_messages(channel_username, limit=TARGET_MSG_LIMIT):
+                if tracer.enabled and now_ns() - fetch_start > FETCH_SPAN_MIN_NS:
+                    tracer.complete("telegram.fetch", fetch_start, now_ns(), "scrape", channel=clean_name)
                 
                 # Map to the structured schema for engineering excellence
                 msg_obj = TelegramMessage(
@@ -95,23 +108,29 @@ class TelegramScraper:
                     
                     try:
                         if not os.path.exists(save_path):
-                            await message.download_media(file=save_path)
+                            with tracer.span("telegram.download_media", "scrape", message_id=message.id):
+                                await message.download_media(file=save_path)
                         
                         # Save path relative to project root for portability
                         msg_obj.image_path = f"{settings.PROJECT.IMAGE_SUBDIR}/{clean_name}/{file_name}"
                         images_downloaded += 1
+                        if image_queue is not None:
+                            await image_queue.put((message.id, save_path))
                     except Exception as e:
                         logging.error(f"Media error on msg {message.id}: {e}")
 
-                messages_data.append(msg_obj.to_dict())
+                messages_data.append(msg_obj)
+                fetch_start = now_ns()
 
-            # Save the JSON file
-            json_file_path = os.path.join(json_dir, f"{clean_name}.json")
-            with open(json_file_path, "w", encoding='utf-8') as f:
-                json.dump(messages_data, f, indent=4, default=str)
+            # Save the channel's partition of the Parquet lake
+            with tracer.span("lake.write_partition", "scrape", rows=len(messages_data)):
+                self.lake.write_partition(messages_data, scrape_date=date_folder, channel=clean_name)
+            tracer.count("scrape.messages", len(messages_data), "scrape")
+            tracer.count("scrape.images", images_downloaded, "scrape")
                 
             logging.info(f"✅ {clean_name}: Saved {len(messages_data)} msgs and {images_downloaded} imgs")
             print(f"✅ {clean_name}: Collected {len(messages_data)} messages.")
+            return messages_data
 
         except errors.FloodWaitError as e:
             logging.warning(f"Flood limit hit! Sleeping {e.seconds}s")
@@ -119,6 +138,7 @@ class TelegramScraper:
         except Exception as e:
             logging.error(f"Critical error scraping {clean_name}: {e}")
             print(f"❌ Error with {channel_username}: {e}")
+        return []
 
     async def run(self, channels: List[str]) -> None:
         """Main execution loop for all provided channels."""
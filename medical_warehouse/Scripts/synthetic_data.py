@@ -0,0 +1,161 @@
+import os
+import csv
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .config import settings
+from .schemas import TelegramMessage
+from .lake import TelegramLake
+
+# --- Constants ---
+ANCHOR_DATE: datetime = datetime(2026, 1, 18, 12, 0, tzinfo=timezone.utc)  # Fixed so output is reproducible
+HISTORY_DAYS: int = 90
+SCRAPE_DATE: str = ANCHOR_DATE.strftime("%Y-%m-%d")
+DETECTIONS_FILE: str = "image_detections.csv"
+FEATURES_FILE: str = "raw/processed_data.csv"
+MODEL_FILE: str = "models/yolo_classifier.joblib"
+
+# COCO labels seen on these channels; bottle/cup/bowl/vase are the classifier's product proxies
+DETECTION_LABELS: List[str] = ['person', 'bottle', 'cup', 'bowl', 'vase', 'cell phone', 'book']
+MESSAGE_WORDS: List[str] = [
+    'paracetamol', 'amoxicillin', 'vitamin', 'syrup', 'cream', 'tablets', 'price',
+    'birr', 'delivery', 'available', 'pharmacy', 'Addis', 'order', 'new', 'stock',
+]
+# Smallest byte sequence image tools recognise as a JPEG (SOI, JFIF APP0, EOI)
+JPEG_STUB: bytes = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00\xff\xd9"
+
+
+class SyntheticDataGenerator:
+    """Fabricates pipeline inputs for N channels x M messages, laid out like BASE_DATA_DIR.
+
+    Every artefact is derived from the seed, so two generators with the same
+    arguments produce identical files and benchmark runs stay comparable.
+    """
+
+    def __init__(self, root: str, channels: int = 3, messages_per_channel: int = 1000,
+                 media_ratio: float = 0.3, seed: int = 42) -> None:
+        self.root: str = root
+        self.channel_names: List[str] = [f"bench_channel_{i:03d}" for i in range(channels)]
+        self.messages_per_channel: int = messages_per_channel
+        self.media_ratio: float = media_ratio
+        self.seed: int = seed
+
+    @property
+    def total_messages(self) -> int:
+        return len(self.channel_names) * self.messages_per_channel
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    # --- Records ---
+    def channel_messages(self, channel_index: int) -> List[TelegramMessage]:
+        """Messages of one channel; ids are unique across channels."""
+        rng = random.Random(self.seed * 100003 + channel_index)
+        channel = self.channel_names[channel_index]
+        image_dir = self.path(settings.PROJECT.IMAGE_SUBDIR, channel)
+        first_id = channel_index * self.messages_per_channel + 1
+
+        messages: List[TelegramMessage] = []
+        for message_id in range(first_id, first_id + self.messages_per_channel):
+            posted = ANCHOR_DATE - timedelta(minutes=rng.randrange(HISTORY_DAYS * 24 * 60))
+            has_media = rng.random() < self.media_ratio
+            messages.append(TelegramMessage(
+                message_id=message_id,
+                channel_name=channel,
+                message_text=" ".join(rng.choices(MESSAGE_WORDS, k=rng.randint(3, 40))),
+                views=int(rng.paretovariate(1.2) * 100),
+                forwards=rng.randint(0, 50),
+                message_date=posted.isoformat(),
+                has_media=has_media,
+                image_path=os.path.join(image_dir, f"{message_id}.jpg") if has_media else None,
+            ))
+        return messages
+
+    def messages(self) -> Iterator[List[TelegramMessage]]:
+        for channel_index in range(len(self.channel_names)):
+            yield self.channel_messages(channel_index)
+
+    def detections(self) -> Iterator[Tuple[int, List[str], List[float], str]]:
+        """(message_id, detected names, confidences, image path) for every media message."""
+        rng = random.Random(self.seed)
+        for batch in self.messages():
+            for message in batch:
+                if message.has_media:
+                    names = rng.choices(DETECTION_LABELS, k=rng.randint(0, 5))
+                    yield message.message_id, names, [round(rng.uniform(0.25, 0.99), 4) for _ in names], message.image_path
+
+    # --- Writers ---
+    def write_json(self) -> List[str]:
+        """Legacy scraper layout: raw/telegram_messages/<date>/<channel>.json."""
+        json_dir = self.path(settings.PROJECT.JSON_SUBDIR, SCRAPE_DATE)
+        os.makedirs(json_dir, exist_ok=True)
+        paths: List[str] = []
+        for channel, batch in zip(self.channel_names, self.messages()):
+            path = os.path.join(json_dir, f"{channel}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump([m.to_dict() for m in batch], f, indent=4, default=str)
+            paths.append(path)
+        return paths
+
+    def write_lake(self) -> List[str]:
+        lake = TelegramLake(self.path(settings.PROJECT.LAKE_SUBDIR))
+        return [lake.write_partition(batch, scrape_date=SCRAPE_DATE, channel=channel)
+                for channel, batch in zip(self.channel_names, self.messages())]
+
+    def write_images(self) -> List[str]:
+        """One stub JPEG per media message under raw/images/<channel>/<message_id>.jpg."""
+        paths: List[str] = []
+        for batch in self.messages():
+            for message in batch:
+                if message.has_media:
+                    os.makedirs(os.path.dirname(message.image_path), exist_ok=True)
+                    with open(message.image_path, "wb") as f:
+                        f.write(JPEG_STUB)
+                    paths.append(message.image_path)
+        return paths
+
+    def write_detections_csv(self) -> str:
+        """Detection rows shaped like YOLOAnalyzer._build_result output."""
+        from .yolo_detect import YOLOAnalyzer
+
+        analyzer = YOLOAnalyzer()  # Weights load lazily; only the row builder is used here
+        path = self.path(DETECTIONS_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = None
+            for message_id, names, confs, img_path in self.detections():
+                row: Dict[str, Any] = analyzer._build_result(message_id, names, confs, img_path)
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+        return path
+
+    def write_features(self, rows: int) -> Tuple[str, str]:
+        """Feature table and a small classifier for the SHAP step, as temp_setup.py builds them."""
+        import joblib
+        import numpy as np
+        import pandas as pd
+        from sklearn.ensemble import RandomForestClassifier
+        from .explainability import FEATURES
+
+        rng = np.random.default_rng(self.seed)
+        data = pd.DataFrame({
+            'message_id': np.arange(rows),
+            'channel_name': rng.choice(self.channel_names, rows),
+            'n_persons': rng.integers(0, 3, rows),
+            'n_bottles': rng.integers(0, 5, rows),
+            'n_pills': rng.integers(0, 10, rows),
+            'view_count': rng.integers(100, 5000, rows),
+        })
+        data['label'] = ((data['n_bottles'] + data['n_pills'] > 6) ^ (rng.random(rows) < 0.1)).astype(int)
+
+        features_path, model_path = self.path(FEATURES_FILE), self.path(MODEL_FILE)
+        for path in (features_path, model_path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        data.to_csv(features_path, index=False)
+        model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=self.seed)
+        joblib.dump(model.fit(data[FEATURES], data['label']), model_path)
+        return features_path, model_path
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import functools
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+from .config import settings
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+now_ns = time.perf_counter_ns
+
+
+@dataclass
+class SpanSummary:
+    """Aggregate of every span sharing a (category, name)."""
+    category: str
+    name: str
+    count: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+
+    def add(self, duration_ns: int) -> None:
+        self.count += 1
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+
+
+class _NoopSpan:
+    """Returned by Tracer.span while tracing is off; one shared instance, no bookkeeping."""
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set(self, **args: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Dict[str, Any]) -> None:
+        self.tracer, self.name, self.category, self.args = tracer, name, category, args
+        self.start = 0
+
+    def __enter__(self) -> "_Span":
+        self.start = now_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.complete(self.name, self.start, now_ns(), self.category, **self.args)
+
+    def set(self, **args: Any) -> None:
+        """Attaches results known only at the end of the span, e.g. row counts."""
+        self.args.update(args)
+
+
+class Tracer:
+    """Collects timed spans and counters, exported as a Chrome trace (chrome://tracing, Perfetto).
+
+    Disabled unless PIPELINE_TRACE is set or enable() is called; while off,
+    span() hands back a shared no-op context and count() returns immediately.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled: bool = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._origin_ns: int = now_ns()
+            self._events: List[Dict[str, Any]] = []
+            self._tracks: Dict[Hashable, int] = {}
+            self._summaries: Dict[Tuple[str, str], SpanSummary] = {}
+            self._counters: Dict[str, float] = defaultdict(float)
+
+    # --- Recording ---
+    def span(self, name: str, category: str = "pipeline", **args: Any) -> Any:
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, category, args)
+
+    def complete(self, name: str, start_ns: int, end_ns: int, category: str = "pipeline", **args: Any) -> None:
+        """Records an interval measured by the caller (what span() does on exit)."""
+        if not self.enabled:
+            return
+        tid = self._track_id()
+        event = {"name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": tid,
+                 "ts": (start_ns - self._origin_ns) / 1000, "dur": (end_ns - start_ns) / 1000}
+        if args:
+            event["args"] = {key: value if isinstance(value, (int, float, bool)) else str(value)
+                             for key, value in args.items()}
+        with self._lock:
+            self._events.append(event)
+            summary = self._summaries.get((category, name))
+            if summary is None:
+                summary = self._summaries[(category, name)] = SpanSummary(category, name)
+            summary.add(end_ns - start_ns)
+
+    def count(self, name: str, value: float = 1, category: str = "pipeline") -> None:
+        """Adds to a running total, drawn as a counter track in the trace viewer."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += value
+            self._events.append({"name": name, "cat": category, "ph": "C", "pid": os.getpid(),
+                                 "ts": (now_ns() - self._origin_ns) / 1000,
+                                 "args": {"total": self._counters[name]}})
+
+    def _track_id(self) -> int:
+        """One trace row per asyncio task or thread, so interleaved coroutines don't overlap."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:  # No event loop in this thread
+            task = None
+        if task is not None:
+            key, label = ("task", id(task)), task.get_name()
+        else:
+            key, label = ("thread", threading.get_ident()), threading.current_thread().name
+
+        with self._lock:
+            tid = self._tracks.get(key)
+            if tid is None:
+                tid = self._tracks[key] = len(self._tracks) + 1
+                self._events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                                     "args": {"name": label}})
+        return tid
+
+    # --- Output ---
+    def export_chrome(self, path: Optional[str] = None) -> str:
+        """Writes the trace in Chrome's JSON format; open it in ui.perfetto.dev or chrome://tracing."""
+        path = path or os.path.join(settings.PROJECT.BASE_DATA_DIR, settings.PROJECT.TRACE_SUBDIR,
+                                    f"trace-{datetime.now():%Y%m%d-%H%M%S}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            payload = {"traceEvents": list(self._events), "displayTimeUnit": "ms"}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        return path
+
+    def summary(self) -> List[SpanSummary]:
+        """Span aggregates, grouped by category and slowest first within each."""
+        with self._lock:
+            rows = list(self._summaries.values())
+        return sorted(rows, key=lambda s: (s.category, -s.total_ns))
+
+    def print_summary(self) -> None:
+        print(f"\n{'stage':<14}{'span':<28}{'count':>7}{'total s':>10}{'mean ms':>10}{'max ms':>10}")
+        for s in self.summary():
+            print(f"{s.category:<14}{s.name:<28}{s.count:>7}{s.total_ns / 1e9:>10.2f}"
+                  f"{s.total_ns / s.count / 1e6:>10.1f}{s.max_ns / 1e6:>10.1f}")
+        for name, total in sorted(self._counters.items()):
+            print(f"{'counter':<14}{name:<28}{total:>7g}")
+
+
+def traced(name: str, category: str = "pipeline") -> Callable[[F], F]:
+    """Decorator form of tracer.span for whole functions."""
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(name, category):
+                return fn(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+# Process-wide tracer shared by the pipeline scripts
+tracer = Tracer(enabled=settings.PIPELINE_TRACE)
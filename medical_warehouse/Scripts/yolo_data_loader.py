@@ -1,14 +1,17 @@
-import pandas as pd
 import os
 import sys
 from pathlib import Path
 from sqlalchemy import create_engine, text # Added text import
+from .tracing import tracer
 
 class YoloDataHandler:
     def __init__(self, engine=None):
-        if engine:
-            self.engine = engine
-        else:
+        # Resolved on first upload so constructing the handler never touches the database
+        self._engine = engine
+
+    @property
+    def engine(self):
+        if self._engine is None:
             current_dir = Path(__file__).resolve().parent if "__file__" in locals() else Path(os.getcwd())
             project_root = current_dir.parent
             
@@ -17,25 +20,28 @@ class YoloDataHandler:
             
             try:
                 from app.db.database import engine as db_engine
-                self.engine = db_engine
+                self._engine = db_engine
             except ImportError as e:
                 try:
                     from app.core.config import settings
-                    self.engine = create_engine(settings.DATABASE_URL)
+                    self._engine = create_engine(settings.DATABASE_URL)
                 except Exception:
                     raise ImportError(
                         f"Could not find database configuration. "
                         f"Ensure 'app/db/session.py' exists. Error: {e}"
                     )
             
-        print(f"Connected to database: {self.engine.url.database}")
+            print(f"Connected to database: {self._engine.url.database}")
+        return self._engine
 
     def upload_yolo_csv(self, csv_path, table_name='image_analysis', schema='processed'):
         if not os.path.exists(csv_path):
             print(f"File not found: {csv_path}")
-            return
+            return False
 
-        df = pd.read_csv(csv_path)
+        import pandas as pd
+        with tracer.span("detections.read_csv", "detect-load"):
+            df = pd.read_csv(csv_path)
         
         # Clean data: ensure message_id is numeric for database joining
         df['message_id'] = pd.to_numeric(df['message_id'], errors='coerce')
@@ -51,10 +57,13 @@ class YoloDataHandler:
                 print(f"Ensured schema '{schema}' exists.")
 
             # Upload to Postgres
-            df.to_sql(table_name, con=self.engine, schema=schema, if_exists='replace', index=False)
+            with tracer.span("detections.to_sql", "detect-load", table=f"{schema}.{table_name}", rows=len(df)):
+                df.to_sql(table_name, con=self.engine, schema=schema, if_exists='replace', index=False)
             print(f"Successfully uploaded {len(df)} rows to {schema}.{table_name}")
+            return True
         except Exception as e:
             print(f"An error occurred during upload: {e}")
+            return False
         # --- FIX ENDS HERE ---
 
 if __name__ == "__main__":
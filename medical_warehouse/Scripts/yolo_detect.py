@@ -1,11 +1,14 @@
 import os
 import glob
 import logging
-from typing import List, Optional, Dict, Any
+import threading
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 
-import pandas as pd
-from ultralytics import YOLO
 from .config import settings
+from .tracing import tracer
+
+if TYPE_CHECKING:  # pandas and ultralytics are imported on first use
+    import pandas as pd
 
 # --- Constants for Engineering Excellence ---
 DEFAULT_MODEL: str = 'yolov8n.pt'
@@ -14,12 +17,41 @@ CATEGORY_PRODUCT: str = 'product_display'
 CATEGORY_LIFESTYLE: str = 'lifestyle'
 CATEGORY_OTHER: str = 'other'
 
+# Process-wide model cache: analyzers asking for the same weights share one instance
+_MODEL_CACHE: Dict[str, Any] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+def get_model(model_name: str = DEFAULT_MODEL) -> Any:
+    """Loads YOLO weights once per process, importing ultralytics on first call."""
+    with _MODEL_CACHE_LOCK:
+        if model_name not in _MODEL_CACHE:
+            from ultralytics import YOLO
+            with tracer.span("yolo.load_model", "detect"):
+                _MODEL_CACHE[model_name] = YOLO(model_name)
+            logging.info(f"YOLO model {model_name} initialized.")
+        return _MODEL_CACHE[model_name]
+
 class YOLOAnalyzer:
-    def __init__(self, model_name: str = DEFAULT_MODEL) -> None:
-        """Initializes the YOLO model with explicit type hints."""
-        self.model = YOLO(model_name)
+    def __init__(self, model_name: str = DEFAULT_MODEL, shared: bool = True) -> None:
+        """Records the model to use; weights are loaded on the first inference.
+
+        Pass shared=False for a private model instance, e.g. one per worker
+        thread, since ultralytics models are not safe for concurrent inference.
+        """
+        self.model_name: str = model_name
+        self.shared: bool = shared
+        self._private_model: Optional[Any] = None
         self._setup_logging()
-        logging.info(f"YOLO model {model_name} initialized.")
+
+    @property
+    def model(self) -> Any:
+        if self.shared:
+            return get_model(self.model_name)
+        if self._private_model is None:
+            from ultralytics import YOLO
+            with tracer.span("yolo.load_model", "detect"):
+                self._private_model = YOLO(self.model_name)
+        return self._private_model
 
     def _setup_logging(self) -> None:
         """Standardized logging to avoid cluttering the console."""
@@ -40,7 +72,37 @@ class YOLOAnalyzer:
             return CATEGORY_LIFESTYLE
         return CATEGORY_OTHER
 
-    def detect_objects(self, image_dir: str) -> Optional[pd.DataFrame]:
+    @staticmethod
+    def message_id_from_path(img_path: str) -> Optional[int]:
+        """Extracts numeric message_id from filename (e.g., '123.jpg' -> 123)."""
+        try:
+            return int(os.path.basename(img_path).split('.')[0])
+        except (ValueError, IndexError):
+            return None
+
+    def _build_result(self, message_id: int, names: List[str], confs: List[float], img_path: str) -> Dict[str, Any]:
+        """Shapes one detection row as written to image_detections.csv."""
+        return {
+            "message_id": message_id,
+            "detected_objects": ", ".join(names) if names else "none",
+            "confidence_score": round(max(confs), 4) if confs else 0.0,
+            "image_category": self._classify_image(names),
+            "image_path": img_path
+        }
+
+    def analyze_image(self, img_path: str, message_id: int) -> List[Dict[str, Any]]:
+        """Runs YOLO inference on a single image and returns its detection rows."""
+        rows: List[Dict[str, Any]] = []
+        model = self.model  # Resolve first so weight loading isn't counted as inference
+        with tracer.span("yolo.inference", "detect", message_id=message_id):
+            results = model(img_path, verbose=False)
+        for r in results:
+            # Map class indices to human-readable names
+            names = [model.names[int(c)] for c in r.boxes.cls.tolist()]
+            rows.append(self._build_result(message_id, names, r.boxes.conf.tolist(), img_path))
+        return rows
+
+    def detect_objects(self, image_dir: str) -> Optional["pd.DataFrame"]:
         """Scans directories for images and performs object detection."""
         results_list: List[Dict[str, Any]] = []
         
@@ -55,33 +117,15 @@ class YOLOAnalyzer:
         logging.info(f"🔍 Starting detection on {len(image_files)} images...")
 
         for img_path in image_files:
-            try:
-                # Extracts numeric message_id from filename (e.g., '123.jpg' -> 123)
-                message_id = int(os.path.basename(img_path).split('.')[0])
-            except (ValueError, IndexError):
-                continue 
-            
-            # Run YOLO inference
-            results = self.model(img_path, verbose=False)
-            
-            for r in results:
-                # Map class indices to human-readable names
-                names = [self.model.names[int(c)] for c in r.boxes.cls.tolist()]
-                confs = r.boxes.conf.tolist()
-                
-                category = self._classify_image(names)
-
-                results_list.append({
-                    "message_id": message_id,
-                    "detected_objects": ", ".join(names) if names else "none",
-                    "confidence_score": round(max(confs), 4) if confs else 0.0,
-                    "image_category": category,
-                    "image_path": img_path
-                })
+            message_id = self.message_id_from_path(img_path)
+            if message_id is None:
+                continue
+            results_list.extend(self.analyze_image(img_path, message_id))
 
+        import pandas as pd
         return pd.DataFrame(results_list)
 
-    def save_results(self, df: pd.DataFrame, filename: str = "image_detections.csv") -> None:
+    def save_results(self, df: "pd.DataFrame", filename: str = "image_detections.csv") -> None:
         """Saves the detection results to the project's data directory."""
         if df is not None and not df.empty:
             output_path = os.path.join(settings.PROJECT.BASE_DATA_DIR, filename)
@@ -1,4 +1,9 @@
-{{ config(materialized='table') }}
+-- The reports API pages and exports in (message_id, channel_key) order; the
+-- index lets keyset seeks and the export stream walk it instead of sorting
+{{ config(
+    materialized='table',
+    indexes=[{'columns': ['message_id', 'channel_key']}]
+) }}
 
 SELECT
     message_id,
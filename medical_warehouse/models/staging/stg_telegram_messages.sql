@@ -8,8 +8,9 @@ SELECT
     CAST(message_id AS INT) AS message_id,
     -- Mapping "channel_name" from JSON to "channel_key"
     CAST(channel_name AS TEXT) AS channel_key, 
-    -- Mapping the timestamp string to a DATE type
-    CAST(message_date AS DATE) AS message_date,
+    -- message_date is TIMESTAMPTZ; take the UTC calendar day so date_key
+    -- doesn't depend on the session TimeZone
+    CAST(message_date AT TIME ZONE 'UTC' AS DATE) AS message_date,
     TRIM(message_text) AS message_text,
     -- Mapping "has_media" from JSON to "has_image"
     COALESCE(has_media, FALSE) AS has_image,
@@ -17,4 +18,9 @@ SELECT
     COALESCE(CAST(views AS INT), 0) AS view_count
 FROM raw_data
 WHERE message_text IS NOT NULL 
-  AND message_text != ''
\ No newline at end of file
+  AND message_text != ''
+{% if var('raw_lookback_months', none) is not none %}
+  -- raw.telegram_messages is range-partitioned by message_date, so this bound
+  -- lets Postgres skip every month partition outside the lookback window
+  AND message_date >= date_trunc('month', now()) - INTERVAL '{{ var("raw_lookback_months") }} months'
+{% endif %}
\ No newline at end of file
@@ -80,4 +80,423 @@ def test_handler_numeric_conversion():
     
     assert len(df) == 2
     assert df['message_id'].iloc[0] == 101
-    assert df['message_id'].iloc[1] == 102
\ No newline at end of file
+    assert df['message_id'].iloc[1] == 102
+# --- 6. Columnar Backend Test: Reports Without a Database ---
+def _write_marts(root):
+    """Small Parquet marts shaped like the dbt exports, for the columnar backend."""
+    from app.db.columnar import mart_path
+
+    messages = pd.DataFrame({
+        "message_id": [1, 2, 3],
+        "channel_key": ["CheMed123", "CheMed123", "tikvahpharma"],
+        "date_key": pd.to_datetime(["2026-01-18", "2026-01-18", "2026-01-19"]).date,
+        "message_text": ["Paracetamol 500mg", "Amoxicillin", "paracetamol syrup"],
+        "view_count": [100, 200, 300],
+    })
+    channels = pd.DataFrame({"channel_key": ["CheMed123", "tikvahpharma"], "channel_name": ["CheMed123", "tikvahpharma"]})
+    detections = pd.DataFrame({"image_category": ["promotional", "promotional"], "view_count": [100, 300]})
+    for (schema, table), df in {
+        ("public", "fct_messages"): messages,
+        ("public", "dim_channels"): channels,
+        ("public_analytics", "fct_image_detections"): detections,
+    }.items():
+        path = mart_path(schema, table, str(root))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_parquet(path, index=False)
+    return str(root)
+
+def test_columnar_backend_answers_reports(tmp_path):
+    """The report endpoints can be served from Parquet marts through DuckDB."""
+    from fastapi import Response
+    from app.api.endpoints import reports
+    from app.db.columnar import ColumnarSession
+
+    db = ColumnarSession(_write_marts(tmp_path))
+    try:
+        response = Response()
+        page = reports.search_messages(response, query="paracetamol", limit=1, cursor=None, db=db)
+        assert [row["message_id"] for row in page] == [1]
+        next_page = reports.search_messages(Response(), query="paracetamol", limit=1,
+                                            cursor=response.headers[reports.NEXT_CURSOR_HEADER], db=db)
+        assert [row["message_id"] for row in next_page] == [3]
+
+        assert reports.get_channel_activity("CheMed123", db=db) == [{"message_date": "2026-01-18", "post_count": 2}]
+        assert reports.get_visual_stats(db=db) == [{"image_category": "promotional", "avg_views": 200.0, "total_images": 2}]
+    finally:
+        db.close()
+
+# --- 7. Lake Test: Partition Pruning & Schema Enforcement ---
+def test_lake_partition_pruning_and_schema(tmp_path):
+    """The lake returns only requested partitions/columns and rejects mistyped records."""
+    from medical_warehouse.Scripts.lake import TelegramLake
+    from medical_warehouse.Scripts.schemas import TelegramMessage
+
+    lake = TelegramLake(str(tmp_path / "lake"))
+    lake.write_partition([TelegramMessage(1, "CheMed123", "Paracetamol", views=10)], "2026-01-18", "CheMed123")
+    lake.write_partition([TelegramMessage(2, "tikvahpharma", "Amoxicillin", has_media=True)], "2026-01-18", "tikvahpharma")
+    lake.write_partition([TelegramMessage(3, "CheMed123", "Vitamin C")], "2026-01-19", "CheMed123")
+
+    df = lake.read(columns=["message_id", "views"], scrape_dates=["2026-01-18"], channels=["CheMed123"])
+    assert list(df.columns) == ["message_id", "views"]
+    assert df["message_id"].tolist() == [1]
+    assert sorted(lake.read()["message_id"].tolist()) == [1, 2, 3]
+
+    with pytest.raises(Exception):
+        lake.write_partition([{"message_id": "not-a-number", "channel_name": "x", "message_text": ""}], "2026-01-20", "x")
+    assert TelegramLake(str(tmp_path / "missing")).read().empty
+
+    # Legacy JSON scrapes are migrated once and then read alongside native partitions
+    json_dir = tmp_path / "json" / "2026-01-17"
+    json_dir.mkdir(parents=True)
+    (json_dir / "CheMed123.json").write_text(json.dumps([TelegramMessage(4, "CheMed123", "Old scrape").to_dict()], default=str))
+    assert len(lake.import_json_tree(str(tmp_path / "json"))) == 1
+    assert lake.import_json_tree(str(tmp_path / "json")) == []
+    assert sorted(lake.read()["message_id"].tolist()) == [1, 2, 3, 4]
+
+# --- 8. Partitioning Test: Month Boundaries ---
+def test_month_partition_helpers():
+    """Partition names and bounds roll over year boundaries correctly."""
+    from datetime import date
+    from medical_warehouse.Scripts.load_to_postgres import _add_months, _partition_name
+
+    assert _add_months(date(2025, 12, 1), 1) == date(2026, 1, 1)
+    assert _add_months(date(2026, 1, 1), -2) == date(2025, 11, 1)
+    assert _partition_name("telegram_messages", date(2026, 1, 1)) == "telegram_messages_p202601"
+
+# --- 9. Orchestrator Test: Stage-Skip Fingerprints ---
+def test_orchestrator_fingerprint_tracks_changes(tmp_path):
+    """Stage inputs fingerprint identically until a file is added or modified."""
+    from main import _fingerprint
+
+    image = tmp_path / "1.jpg"
+    image.write_bytes(b"jpeg")
+    first = _fingerprint([str(image)])
+    assert _fingerprint([str(image)]) == first
+
+    (tmp_path / "2.jpg").write_bytes(b"jpeg")
+    assert _fingerprint([str(image), str(tmp_path / "2.jpg")]) != first
+
+# --- 10. Explainability Test: Incremental SHAP Cache ---
+def test_shap_cache_explains_only_new_rows(tmp_path):
+    """A rerun reuses cached SHAP values and only explains rows added since."""
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from medical_warehouse.Scripts.explainability import FEATURES, generate_model_explanations
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({name: rng.integers(0, 50, 60) for name in FEATURES})
+    data["label"] = rng.integers(0, 2, 60)
+    model_path, data_path = tmp_path / "model.joblib", tmp_path / "data.csv"
+    joblib.dump(RandomForestClassifier(n_estimators=5, random_state=0).fit(data[FEATURES], data["label"]), model_path)
+    data.iloc[:50].to_csv(data_path, index=False)
+
+    first = generate_model_explanations(str(model_path), str(data_path), str(tmp_path / "out"))
+    assert first["rendered"] and first["computed"] == first["rows"]
+
+    again = generate_model_explanations(str(model_path), str(data_path), str(tmp_path / "out"))
+    assert again["computed"] == 0 and not again["rendered"]
+
+    data.to_csv(data_path, index=False)
+    updated = generate_model_explanations(str(model_path), str(data_path), str(tmp_path / "out"))
+    assert updated["cached"] == 50 and updated["rendered"]
+
+    # Interventional SHAP keeps its first background sample, so new rows don't reset the cache
+    data.iloc[:50].to_csv(data_path, index=False)
+    kwargs = {"background_size": 20, "output_dir": str(tmp_path / "bg")}
+    generate_model_explanations(str(model_path), str(data_path), **kwargs)
+    data.to_csv(data_path, index=False)
+    grown = generate_model_explanations(str(model_path), str(data_path), **kwargs)
+    assert grown["cached"] == 50 and grown["computed"] == grown["rows"] - 50
+
+# --- 11. Startup Test: Import-Time Budget ---
+IMPORT_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = ["pandas", "pyarrow", "telethon", "torch", "ultralytics", "shap"]
+
+def test_pipeline_imports_stay_light():
+    """Importing the orchestrator must not pull in the heavy ML/data stacks."""
+    import subprocess
+    code = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps([elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=project_root,
+                            capture_output=True, text=True, check=True).stdout
+    elapsed, loaded = json.loads(output.strip().splitlines()[-1])
+    assert loaded == []
+    assert elapsed < IMPORT_BUDGET_SECONDS
+
+# --- 12. Benchmark Data Test: Synthetic Generator ---
+def test_synthetic_generator_feeds_every_reader(tmp_path):
+    """Generated JSON, lake and detections line up with what the pipeline readers expect."""
+    from medical_warehouse.Scripts.config import settings
+    from medical_warehouse.Scripts.lake import TelegramLake
+    from medical_warehouse.Scripts.synthetic_data import SyntheticDataGenerator
+
+    gen = SyntheticDataGenerator(str(tmp_path), channels=3, messages_per_channel=40)
+    gen.write_json()
+    gen.write_lake()
+    images = gen.write_images()
+
+    records = TelegramDataLoader().load_json_files(gen.path(settings.PROJECT.JSON_SUBDIR))
+    assert len(records) == gen.total_messages == len({r["message_id"] for r in records})
+    assert len(TelegramLake(gen.path(settings.PROJECT.LAKE_SUBDIR)).read()) == gen.total_messages
+
+    detections = pd.read_csv(gen.write_detections_csv())
+    assert sorted(detections["image_path"]) == sorted(images)
+    # Same seed, same data: benchmark runs on different commits see identical inputs
+    again = SyntheticDataGenerator(str(tmp_path), channels=3, messages_per_channel=40)
+    assert again.channel_messages(1) == gen.channel_messages(1)
+
+# --- 13. Tracing Test: Chrome Trace Export ---
+def test_tracer_is_inert_until_enabled(tmp_path):
+    """A disabled tracer hands out one shared no-op span; an enabled one exports X and C events."""
+    from medical_warehouse.Scripts.tracing import Tracer
+
+    tracer = Tracer()
+    assert tracer.span("load.to_sql", "load") is tracer.span("other")
+    tracer.count("scrape.messages", 5)
+    assert tracer.summary() == []
+
+    tracer.enable()
+    with tracer.span("load.to_sql", "load", rows=3) as span:
+        span.set(table="raw.telegram_messages")
+    tracer.count("scrape.messages", 5, "scrape")
+
+    with open(tracer.export_chrome(str(tmp_path / "trace.json")), encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert spans[0]["name"] == "load.to_sql" and spans[0]["args"] == {"rows": 3, "table": "raw.telegram_messages"}
+    assert [e["args"]["total"] for e in events if e["ph"] == "C"] == [5]
+    assert [(s.category, s.name, s.count) for s in tracer.summary()] == [("load", "load.to_sql", 1)]
+
+# --- 14. Partitioning Test: Routing, Retention & Legacy Conversion (Postgres) ---
+@pytest.fixture
+def scratch_raw_schema(monkeypatch):
+    """Points the loader's raw schema at a throwaway schema on the CI Postgres service."""
+    from dataclasses import replace
+    from sqlalchemy import create_engine, text
+    from medical_warehouse.Scripts.config import settings
+
+    url = os.environ.get("DATABASE_URL") or (
+        f"postgresql://{settings.DB_USER}:{settings.DB_PASS}@{settings.DB_HOST}:{settings.DB_PORT}/postgres"
+    )
+    engine = create_engine(url)
+    try:
+        with engine.connect():
+            pass
+    except Exception as e:
+        pytest.skip(f"Postgres not reachable: {e.__class__.__name__}")
+
+    schema = f"test_raw_{os.getpid()}"
+    monkeypatch.setattr(settings, "PROJECT", replace(settings.PROJECT, RAW_SCHEMA=schema))
+    yield engine, schema
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    engine.dispose()
+
+def test_partitioned_load_retention_and_reload(scratch_raw_schema, monkeypatch):
+    """Legacy rows are migrated, months route to their partitions, and retention sticks across reloads."""
+    from datetime import timedelta
+    from sqlalchemy import text
+    from medical_warehouse.Scripts.config import settings
+    from medical_warehouse.Scripts.load_to_postgres import _add_months, _month_start
+
+    engine, schema = scratch_raw_schema
+    this_month = _month_start(datetime.now(timezone.utc).date())
+    old, older = _add_months(this_month, -13), _add_months(this_month, -14)
+
+    def message(message_id, month):
+        day = None if month is None else (month + timedelta(days=1)).isoformat() + "T23:30:00+00:00"
+        return {"message_id": message_id, "channel_name": "CheMed123", "message_text": "x", "views": 1,
+                "forwards": 0, "message_date": day, "has_media": False, "image_path": None}
+
+    def placement():
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                f"SELECT tableoid::regclass::text, count(*) FROM {schema}.telegram_messages GROUP BY 1"
+            )).all()
+        return {name.split(".")[-1]: n for name, n in rows}
+
+    # A pre-partitioning table with ISO text dates is converted on first load
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+        conn.execute(text(
+            f"CREATE TABLE {schema}.telegram_messages (message_id BIGINT, channel_name TEXT, message_text TEXT, "
+            f"views INT, forwards INT, message_date TEXT, has_media BOOLEAN, image_path TEXT)"
+        ))
+        conn.execute(text(
+            f"INSERT INTO {schema}.telegram_messages VALUES (1, 'CheMed123', 'x', 1, 0, :day, false, null)"
+        ), {"day": message(1, older)["message_date"]})
+
+    loader = TelegramDataLoader()
+    loader.engine = engine
+    batch = [message(2, this_month), message(3, old), message(4, None)]
+    loader.load_messages(batch)
+    assert placement() == {f"telegram_messages_p{older:%Y%m}": 1, f"telegram_messages_p{old:%Y%m}": 1,
+                           f"telegram_messages_p{this_month:%Y%m}": 1, "telegram_messages_default": 1}
+
+    # Detach, then reload the same lake: expired months must not come back via DEFAULT
+    monkeypatch.setattr(settings, "RAW_RETENTION_MONTHS", 6)
+    assert loader.apply_retention(mode="detach") == [f"telegram_messages_p{older:%Y%m}",
+                                                     f"telegram_messages_p{old:%Y%m}"]
+    loader.load_messages(batch)
+    assert placement() == {f"telegram_messages_p{this_month:%Y%m}": 2, "telegram_messages_default": 2}
+    assert loader.apply_retention(mode="detach") == []
+    with engine.connect() as conn:
+        tables = set(conn.execute(text(
+            "SELECT tablename FROM pg_tables WHERE schemaname = :schema"), {"schema": schema}).scalars())
+    assert {f"telegram_messages_detached_{old:%Y%m}", "telegram_messages_legacy"} <= tables
+
+    # Without a window the month loads again into a fresh partition, which "drop" then removes
+    monkeypatch.setattr(settings, "RAW_RETENTION_MONTHS", 0)
+    loader.load_messages([message(5, old)])
+    assert placement()[f"telegram_messages_p{old:%Y%m}"] == 1
+    assert loader.apply_retention(months=6, mode="drop") == [f"telegram_messages_p{old:%Y%m}"]
+    assert f"telegram_messages_p{old:%Y%m}" not in placement()
+
+# --- 15. Orchestrator Test: Partition-Level Reloads & Failure Retry ---
+def test_orchestrator_reloads_only_changed_or_failed_partitions(tmp_path, monkeypatch):
+    """Unchanged lake partitions are never re-appended; a failed partition is retried on the next run."""
+    import asyncio
+    from dataclasses import replace
+    import main
+    from medical_warehouse.Scripts.config import settings
+    from medical_warehouse.Scripts.lake import TelegramLake
+
+    class FakeLoader:
+        calls, failing = [], set()
+
+        def load_messages(self, batch):
+            channel = batch["channel_name"].iloc[0]
+            FakeLoader.calls.append(channel)
+            return channel not in FakeLoader.failing
+
+        def apply_retention(self):
+            return []
+
+    dbt_runs = []
+
+    async def fake_dbt(run):
+        dbt_runs.append(run)
+        return True
+
+    monkeypatch.setattr(settings, "PROJECT", replace(settings.PROJECT, BASE_DATA_DIR=str(tmp_path)))
+    monkeypatch.setattr(main, "STATE_FILE", str(tmp_path / "state.json"))
+    monkeypatch.setattr(main, "TelegramDataLoader", FakeLoader)
+    monkeypatch.setattr(main, "run_dbt", fake_dbt)
+
+    lake = TelegramLake(str(tmp_path / settings.PROJECT.LAKE_SUBDIR))
+    def write(channel, message_id):
+        lake.write_partition([{"message_id": message_id, "channel_name": channel, "message_text": "x"}],
+                             "2026-01-18", channel)
+
+    def run_and_collect():
+        FakeLoader.calls = []
+        dbt_runs.clear()
+        asyncio.run(main.run_full_pipeline(channels=None))
+        return sorted(FakeLoader.calls), len(dbt_runs)
+
+    write("alpha", 1)
+    write("beta", 2)
+    FakeLoader.failing = {"beta"}
+    assert run_and_collect() == (["alpha", "beta"], 1)
+
+    # The retried partition lands in the warehouse, so the marts are rebuilt too
+    FakeLoader.failing = set()
+    assert run_and_collect() == (["beta"], 1)
+    assert run_and_collect() == ([], 0)
+
+    write("alpha", 3)
+    assert run_and_collect() == (["alpha"], 1)
+
+# --- 16. Observability Test: Prometheus Metrics Endpoint ---
+def test_metrics_endpoint_reports_routes_histograms_and_slow_queries(tmp_path, monkeypatch):
+    """/metrics labels requests by route template and counts statements slower than SLOW_QUERY_MS."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine, event, text
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.main import app
+    from app.core import metrics
+    from app.core.config import settings as api_settings
+    from app.db.database import get_db
+
+    client = TestClient(app)
+    monkeypatch.setattr(api_settings, "REPORTS_BACKEND", "columnar")
+    monkeypatch.setattr(api_settings, "MARTS_DIR", _write_marts(tmp_path))
+    assert client.get("/api/v1/reports/channels/CheMed123/activity").status_code == 200
+
+    # Statement timing hangs off the SQLAlchemy engine hooks; SQLite stands in for Postgres
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", lambda dbapi_conn, _: dbapi_conn.execute("ATTACH DATABASE ':memory:' AS public"))
+    event.listen(engine, "before_cursor_execute", metrics.before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", metrics.after_cursor_execute)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE public.fct_messages (message_text TEXT)"))
+        conn.execute(text("INSERT INTO public.fct_messages VALUES ('Paracetamol'), ('Paracetamol')"))
+
+    def sqlite_db():
+        db = sessionmaker(bind=engine)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, sqlite_db)
+    monkeypatch.setattr(api_settings, "SLOW_QUERY_MS", 1e-6)
+    assert client.get("/api/v1/reports/top-products").json() == [{"product_name": "Paracetamol", "mention_count": 2}]
+
+    body = client.get("/metrics").text
+    route = 'route="/api/v1/reports/channels/{channel_name}/activity"'
+    assert f'api_requests_total{{method="GET",{route},status="200"}}' in body
+    assert "CheMed123" not in body  # Raw path values never become labels
+    for suffix in ('_bucket{method="GET",' + route + ',le="+Inf"}', '_sum{method="GET",' + route + '}',
+                   '_count{method="GET",' + route + '}'):
+        assert f"api_request_duration_seconds{suffix}" in body
+    assert 'api_sql_query_seconds_count{route="/api/v1/reports/top-products"}' in body
+    assert 'api_sql_slow_queries_total{route="/api/v1/reports/top-products"}' in body
+
+# --- 17. Export Test: Streamed NDJSON/CSV & Cursor Validation ---
+def test_export_formats_and_malformed_cursor(tmp_path, monkeypatch):
+    """Exports stream every match (a header-only CSV when none do); bad cursors are a 400."""
+    import base64
+    import csv
+    import io
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.api.endpoints import reports
+    from app.core.config import settings as api_settings
+
+    monkeypatch.setattr(api_settings, "REPORTS_BACKEND", "columnar")
+    monkeypatch.setattr(api_settings, "MARTS_DIR", _write_marts(tmp_path))
+    client = TestClient(app)
+
+    ndjson = client.get("/api/v1/reports/export/messages", params={"format": "ndjson", "query": "paracetamol"})
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == [
+        {"message_id": 1, "channel_name": "CheMed123", "message_text": "Paracetamol 500mg", "view_count": 100},
+        {"message_id": 3, "channel_name": "tikvahpharma", "message_text": "paracetamol syrup", "view_count": 300},
+    ]
+
+    exported = client.get("/api/v1/reports/export/messages", params={"format": "csv"})
+    assert exported.headers["content-type"].startswith("text/csv")
+    assert 'filename="messages.csv"' in exported.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(exported.text)))
+    assert rows[0] == reports.EXPORT_COLUMNS
+    assert [row[0] for row in rows[1:]] == ["1", "2", "3"]
+
+    empty = client.get("/api/v1/reports/export/messages", params={"format": "csv", "query": "no-such-product"})
+    assert empty.status_code == 200
+    assert empty.text.splitlines() == [",".join(reports.EXPORT_COLUMNS)]
+
+    # Undecodable, not a [message_id, channel_key] pair, and an id int() cannot represent
+    malformed = ["not-a-cursor"] + [base64.urlsafe_b64encode(raw).decode("ascii") for raw in (b"42", b'[1e999, "a"]')]
+    for cursor in malformed:
+        bad = client.get("/api/v1/reports/search/messages", params={"query": "paracetamol", "cursor": cursor})
+        assert bad.status_code == 400
+        assert bad.json() == {"detail": "Invalid pagination cursor"}